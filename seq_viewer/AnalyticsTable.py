@@ -0,0 +1,97 @@
+# Author: Nana K. Owusu
+# This module contains the window that lists the per-shot gradient
+# and RF figures of merit from the backend_analytics module. The
+# figures are computed chunk by chunk in a background thread and the
+# table is filled in as each chunk arrives.
+
+# Modules for GUI #
+from tkinter import Toplevel
+from tkinter.ttk import Treeview, Scrollbar, Label
+
+# Modules for computing the table off the GUI thread #
+from threading import Thread
+from queue import Queue, Empty
+
+# Module for the figures of merit #
+from backend_analytics import stream_metrics, BOARD_NAMES, \
+    GRADIENT_BOARDS, RF_BOARDS
+
+
+class AnalyticsTable(Toplevel):
+    """ Tkinter based window with one row per shot and board of
+    peak amplitude, peak slew rate, RMS amplitude and mean power.
+    """
+    COLUMNS = ('shot', 'board', 'duration', 'peak', 'max_slew', 'rms', 'power')
+    HEADINGS = ('Shot #', 'Board', 'Duration (us)', 'Peak (a.u.)',
+                'Max slew (a.u./us)', 'RMS (a.u.)', 'Power (a.u.)')
+
+    def __init__(self, parent, xml_paths, boards=GRADIENT_BOARDS + RF_BOARDS,
+                 workers=0):
+        Toplevel.__init__(self, parent)
+
+        Toplevel.wm_title(self, "Gradient and RF analytics")
+
+        self.shot_count = len(xml_paths)
+        self.rows_done = 0
+
+        self.status = Label(self, text="Reading shots...")
+        self.status.pack(side="bottom", anchor="sw", fill="x")
+
+        self.table = Treeview(self, columns=self.COLUMNS, show="headings")
+        for column, heading in zip(self.COLUMNS, self.HEADINGS):
+            self.table.heading(column, text=heading)
+            self.table.column(column, width=110, anchor="e")
+
+        v_scroll = Scrollbar(self, command=self.table.yview)
+        self.table.config(yscrollcommand=v_scroll.set)
+        v_scroll.pack(side="right", fill="y")
+        self.table.pack(side="left", fill="both", expand=True)
+
+        # Chunks of rows handed from the worker thread to the GUI
+        self.chunks = Queue()
+        self.worker = Thread(target=self.compute, daemon=True,
+                             args=(xml_paths, boards, workers))
+        self.worker.start()
+        self.after(100, self.poll_rows)
+
+    def compute(self, xml_paths, boards, workers):
+        # Ends with None when done or with the exception that stopped it
+        try:
+            for metrics in stream_metrics(xml_paths, boards, workers=workers):
+                self.chunks.put(metrics)
+        except Exception as err:
+            self.chunks.put(err)
+            return
+        self.chunks.put(None)
+
+    def poll_rows(self):
+        while True:
+            try:
+                metrics = self.chunks.get_nowait()
+            except Empty:
+                break
+
+            if metrics is None:
+                self.status.config(text="{0} shots".format(self.shot_count))
+                return
+
+            if isinstance(metrics, Exception):
+                self.status.config(text="Stopped at {0}/{1} shots: {2}".format(
+                    self.rows_done, self.shot_count,
+                    str(metrics) or type(metrics).__name__))
+                return
+
+            for row in metrics:
+                self.table.insert("", "end", values=(
+                    row['shot'], BOARD_NAMES[row['board']],
+                    '{0:.1f}'.format(row['duration']),
+                    '{0:.4g}'.format(row['peak']),
+                    '{0:.4g}'.format(row['max_slew']),
+                    '{0:.4g}'.format(row['rms']),
+                    '{0:.4g}'.format(row['power'])))
+
+            self.rows_done = metrics['shot'].max() + 1
+            self.status.config(text="Read {0}/{1} shots".format(
+                self.rows_done, self.shot_count))
+
+        self.after(100, self.poll_rows)
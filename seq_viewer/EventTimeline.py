@@ -0,0 +1,179 @@
+# Author: Nana K. Owusu
+# This module contains the window that shows the pulse and lobe events
+# of sequencer boards as a timeline: one row per shot and one rectangle
+# per event, from its start to its end time. The rectangles of a board
+# are drawn by a single PolyCollection, so an acquisition of thousands
+# of shots draws in one go instead of as thousands of lines. A search
+# box picks out events by their fields (see backend_events) and steps
+# the animation through the shots that have them.
+
+# Modules for GUI #
+from tkinter import Toplevel, Frame, StringVar
+from tkinter.ttk import Button, Entry, Label
+
+# Modules for interactive plotting in GUI #
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg as FigCanvas
+from matplotlib.backends.backend_tkagg import NavigationToolbar2Tk as NavTb2
+from matplotlib.collections import PolyCollection
+from matplotlib.figure import Figure
+
+# Modules for finding the events #
+from concurrent.futures import ThreadPoolExecutor
+from numpy import concatenate, empty, unique, searchsorted
+from backend_events import board_events, search_events, parse_query, \
+    EVENT_DTYPE
+from backend_analytics import BOARD_NAMES
+
+BOARD_COLORS = ('0.5', 'tab:blue', 'tab:green', 'tab:purple',
+                'tab:red', 'tab:orange', 'tab:brown', 'tab:olive')
+
+
+def event_boxes(events, lanes):
+    """ Corners of the rectangle of each event
+
+    :param events: Structured array (EVENT_DTYPE)
+    :param lanes: Dict of board number to its lane within a shot's row
+    :return: Array of shape (events, 4, 2) for PolyCollection
+    """
+    height = 0.8 / max(len(lanes), 1)
+    lane = empty(events.size)
+    for board, idx in lanes.items():
+        lane[events['board'] == board] = idx
+
+    bottom = events['shot'] - 0.4 + lane * height
+    top = bottom + height * 0.9
+
+    boxes = empty((events.size, 4, 2))
+    boxes[:, 0, 0] = boxes[:, 1, 0] = events['start']
+    boxes[:, 2, 0] = boxes[:, 3, 0] = events['end']
+    boxes[:, 0, 1] = boxes[:, 3, 1] = bottom
+    boxes[:, 1, 1] = boxes[:, 2, 1] = top
+
+    return boxes
+
+
+class EventTimeline(Toplevel):
+    """ Tkinter based window with the events of one or more boards
+    for every shot. Clicking a row moves the ShotAnimator to that shot.
+    """
+    def __init__(self, parent, waves, animator=None, batch=512):
+        Toplevel.__init__(self, parent)
+
+        Toplevel.wm_title(self, "Events: {0}".format(
+            ", ".join(BOARD_NAMES[x] for x in waves)))
+
+        self.animator = animator
+        self.shot_count = max(x.shape[0] for x in waves.values())
+        self.lanes = {board: idx for idx, board in enumerate(sorted(waves))}
+
+        self.events = empty(0, dtype=EVENT_DTYPE)
+        self.matches = empty(0, dtype=int)
+        self.highlight = None
+
+        # Widgets for searching the events
+        self.search_frame = Frame(self)
+        self.search_frame.pack(side="top", anchor="nw", fill="x")
+
+        self.query = StringVar(self)
+        self.query.set("magnitude>0.5")
+        query_entry = Entry(self.search_frame, textvariable=self.query,
+                            width=50)
+        query_entry.bind("<Return>", lambda event: self.find())
+        query_entry.pack(side="left")
+
+        Button(self.search_frame, text="Find",
+               command=lambda: self.find()).pack(side="left")
+        Button(self.search_frame, text="Next shot",
+               command=lambda: self.next_match()).pack(side="left")
+
+        self.status = Label(self.search_frame, text="Finding events...")
+        self.status.pack(side="left", padx=8)
+
+        self.fig = Figure(figsize=[10.0, 7.0])
+        self.ax = self.fig.add_subplot(1, 1, 1)
+        self.ax.set_xlabel('Time (us)')
+        self.ax.set_ylabel('Shot #')
+        self.ax.set_ylim(self.shot_count - 0.5, -0.5)
+
+        self.mpl_cnv = FigCanvas(self.fig, self)
+        self.toolbar = NavTb2(self.mpl_cnv, self)
+        self.toolbar.pack(side="bottom", anchor="sw", fill="x")
+        self.mpl_cnv.get_tk_widget().pack(side="top", fill="both", expand=True)
+        self.mpl_cnv.mpl_connect('button_press_event', self.row_clicked)
+
+        # Segment each board in a worker thread
+        self.pool = ThreadPoolExecutor(max_workers=len(waves))
+        self.pending = [self.pool.submit(board_events, wave, board, batch)
+                        for board, wave in waves.items()]
+        self.protocol("WM_DELETE_WINDOW", self.close)
+        self.after(50, self.poll_events)
+
+    def poll_events(self):
+        # Draw the boards finished so far, one collection each
+        done = [job for job in self.pending if job.done()]
+        for job in done:
+            self.pending.remove(job)
+            events = job.result()
+            if events.size == 0:
+                continue
+
+            board = int(events['board'][0])
+            self.ax.add_collection(PolyCollection(
+                event_boxes(events, self.lanes), facecolors=BOARD_COLORS[board],
+                edgecolors='none', label=BOARD_NAMES[board]))
+            self.events = concatenate([self.events, events])
+
+        if done:
+            if self.events.size:
+                self.ax.set_xlim(self.events['start'].min(),
+                                 self.events['end'].max())
+                self.ax.legend(loc='upper right')
+            self.status.config(text="{0} events".format(self.events.size))
+            self.mpl_cnv.draw_idle()
+
+        if self.pending:
+            self.after(50, self.poll_events)
+
+    def find(self):
+        """ Outlines the events matching the search box and lists the
+        shots they are in """
+        try:
+            found = search_events(self.events,
+                                  **parse_query(self.query.get(), BOARD_NAMES))
+        except UserWarning as err:
+            self.status.config(text=str(err))
+            return
+
+        if self.highlight is not None:
+            self.highlight.remove()
+
+        self.highlight = PolyCollection(
+            event_boxes(self.events[found], self.lanes), facecolors='none',
+            edgecolors='red', linewidths=1.5)
+        self.ax.add_collection(self.highlight)
+
+        self.matches = unique(self.events['shot'][found])
+        self.status.config(text="{0} events in {1} shots".format(
+            found.sum(), self.matches.size))
+        self.mpl_cnv.draw_idle()
+
+    def next_match(self):
+        # Move the animation to the next shot with a matching event
+        if self.animator is None or self.matches.size == 0:
+            return
+
+        current = self.animator.current_frame
+        idx = 0 if current is None else searchsorted(self.matches, current,
+                                                     side='right')
+        self.animator.seek(int(self.matches[idx % self.matches.size]))
+
+    def row_clicked(self, event):
+        # Ignore clicks meant for the zoom/pan tools
+        if event.inaxes is None or self.toolbar.mode or self.animator is None:
+            return
+
+        self.animator.seek(int(round(event.ydata)))
+
+    def close(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        self.destroy()
@@ -0,0 +1,304 @@
+# Author: Nana K. Owusu
+# This module contains the classes that pre-render shots of the
+# boards being animated. A background thread draws the shots that
+# neighbour the one on display into off-screen Agg buffers so that
+# stepping and playback only have to copy a bitmap onto the canvas.
+
+# Modules for the background renderer #
+from threading import Thread, Condition
+
+# Modules for off-screen drawing #
+from numpy import asarray, fmin, fmax, isnan
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+# Module for copying bitmaps to a tkinter canvas #
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+
+def frame_limits(x_data, y_data):
+    """ Axis limits used to display a single shot of a board
+
+    :param x_data: Array of time values of the shot
+    :param y_data: Array of amplitude values of the shot
+    :return: x_lim, y_lim: lists of [min, max] for each axis
+    """
+    # Missing values (NaN) are skipped; a shot with none gets [0, 1]
+    y_lim = [fmin.reduce(y_data), fmax.reduce(y_data)]
+    x_lim = [fmin.reduce(x_data), fmax.reduce(x_data)]
+
+    for lim in (x_lim, y_lim):
+        if isnan(lim[0]):
+            lim[:] = [0.0, 0.0]
+
+    if y_lim[0] == y_lim[1]:
+        y_lim[1] = y_lim[0] + 1
+
+    if x_lim[0] == x_lim[1]:
+        x_lim[1] = x_lim[0] + 1
+
+    return x_lim, y_lim
+
+
+def merge_limits(limits, other):
+    """ Axis limits covering two sets of limits
+
+    :param limits: x_lim, y_lim from frame_limits()
+    :param other: x_lim, y_lim of another line on the same axis
+    :return: x_lim, y_lim: lists of [min, max] for each axis
+    """
+    return [[min(a[0], b[0]), max(a[1], b[1])] for a, b in zip(limits, other)]
+
+
+def draw_envelope(ax, grid, stats):
+    """ Shades the min/max envelope of all shots behind a board's line
+
+    :param ax: Axes of the board
+    :param grid: Array of the common time grid
+    :param stats: ShotStatistics of the board
+    :return: List of the artists added
+    """
+    band = ax.fill_between(grid, stats.low, stats.high, color='0.85',
+                           lw=0, zorder=0)
+    mean = ax.plot(grid, stats.mean, color='0.55', lw=0.8, zorder=1)
+
+    return [band] + mean
+
+
+class FrameLayout:
+    """ Snapshot of the figure being animated. The snapshot holds
+    everything the background thread needs to draw a shot without
+    touching the figure that is shown in the GUI.
+    """
+    def __init__(self, fig, boards, axes, names, envelopes=None,
+                 overlays=None):
+        envelopes = envelopes or dict()
+        overlays = overlays or dict()
+
+        self.size = tuple(fig.get_size_inches())
+        self.dpi = fig.dpi
+        self.pixels = (int(fig.bbox.width), int(fig.bbox.height))
+        self.facecolor = fig.get_facecolor()
+
+        # Board data, axis position and title in drawing order
+        self.panels = [(boards[board], axes[board].get_position().bounds,
+                        names[board]) for board in axes if board in boards]
+        self.envelopes = [envelopes.get(board) for board in axes if board in boards]
+        self.overlays = [overlays.get(board, []) for board in axes if board in boards]
+
+    def build(self):
+        """ Creates an off-screen copy of the animated figure
+
+        :return: fig, lines: Figure drawn by Agg and the lines of each
+        panel, the board's own line first
+        """
+        fig = Figure(figsize=self.size, dpi=self.dpi,
+                     facecolor=self.facecolor)
+        FigureCanvasAgg(fig)
+
+        lines = []
+        for (data, bounds, name), envelope, overlays in zip(
+                self.panels, self.envelopes, self.overlays):
+            ax = fig.add_axes(bounds)
+            ax.set_ylabel('Amplitude \n(a.u.)')
+            ax.set_title('Sequence {0} Board'.format(name))
+            lines.append(ax.plot([], [], 'b-', lw=1) +
+                         [ax.plot([], [], '-', color=color, lw=1)[0]
+                          for wave, color in overlays])
+
+            if envelope is not None:
+                draw_envelope(ax, *envelope)
+
+        return fig, lines
+
+
+class FrameCache:
+    """ Bounded store of pre-rendered RGBA frames filled by a
+    background thread. Frames around the shot on display are drawn
+    first; the frames furthest from it are dropped when the memory
+    limit is reached.
+    """
+    def __init__(self, memory_limit=256, window=16):
+        # Memory limit in megabytes and the count of shots on
+        # either side of the current one to render ahead of time.
+        self.memory_limit = memory_limit * 2**20
+        self.window = window
+
+        self.frames = dict()
+        self.frame_bytes = 0
+
+        self.layout = None
+        self.shot_count = 0
+        self.current = 0
+        self.direction = 1
+        self.generation = 0
+
+        self.busy = Condition()
+        self.closed = False
+        self.worker = Thread(target=self._render_loop, daemon=True)
+        self.worker.start()
+
+    def __contains__(self, shot):
+        return shot in self.frames
+
+    def get(self, shot):
+        return self.frames.get(shot)
+
+    def invalidate(self, layout=None, shot_count=None):
+        """ Drops every cached frame. Called when boards are toggled,
+        axes are zoomed or the figure is resized.
+
+        :param layout: FrameLayout of the figure; None pauses rendering
+        :param shot_count: Integer representing the count of XML files read in
+        """
+        with self.busy:
+            self.generation += 1
+            self.frames.clear()
+            self.frame_bytes = 0
+            self.layout = layout
+
+            if shot_count is not None:
+                self.shot_count = shot_count
+
+            self.busy.notify()
+
+    def prefetch(self, shot, direction=1):
+        """ Moves the render window to centre on the shot on display
+
+        :param shot: Integer of the shot on display
+        :param direction: 1 when playing forward and -1 when backward
+        """
+        with self.busy:
+            self.current = shot
+            self.direction = direction or 1
+            self.busy.notify()
+
+    def close(self):
+        with self.busy:
+            self.closed = True
+            self.busy.notify()
+
+    def _wanted(self):
+        # Shots to render, nearest first and favouring the direction
+        # of play.
+        order = [self.current]
+        for step in range(1, self.window + 1):
+            order.append(self.current + step * self.direction)
+            order.append(self.current - step * self.direction)
+
+        # Only ask for as many frames as fit in the memory limit
+        width, height = self.layout.pixels
+        fits = max(1, self.memory_limit // max(1, width * height * 4))
+
+        return [shot % self.shot_count for shot in order[:fits]]
+
+    def _next_job(self):
+        # Called with the lock held. Returns the next shot to draw
+        # or None when the window is full or nothing is loaded.
+        if self.layout is None or self.shot_count == 0:
+            return None
+
+        for shot in self._wanted():
+            if shot not in self.frames:
+                return shot
+
+        return None
+
+    def _store(self, shot, rgba, generation):
+        # Called with the lock held. Keeps the frame unless it was
+        # drawn for a layout that has since changed.
+        if generation != self.generation:
+            return
+
+        wanted = self._wanted()
+        self.frames[shot] = rgba
+        self.frame_bytes += rgba.nbytes
+
+        # Evict the frames furthest from the shot on display
+        while self.frame_bytes > self.memory_limit and len(self.frames) > 1:
+            far = max(self.frames, key=lambda x: (x not in wanted,
+                                                  abs(x - self.current)))
+            self.frame_bytes -= self.frames.pop(far).nbytes
+
+            if far == shot:
+                break
+
+    def _render_loop(self):
+        fig, lines, built_for = None, [], None
+
+        while True:
+            with self.busy:
+                shot = self._next_job()
+                while shot is None and not self.closed:
+                    self.busy.wait()
+                    shot = self._next_job()
+
+                if self.closed:
+                    return
+
+                layout = self.layout
+                generation = self.generation
+
+            if built_for is not layout:
+                fig, lines = layout.build()
+                built_for = layout
+
+            rgba = self._render(fig, lines, layout, shot)
+
+            with self.busy:
+                self._store(shot, rgba, generation)
+
+    @staticmethod
+    def _render(fig, lines, layout, shot):
+        for panel_lines, (data, bounds, name), overlays in zip(
+                lines, layout.panels, layout.overlays):
+            x_data, y_data = data[shot, 0, :], data[shot, 1, :]
+            x_lim, y_lim = frame_limits(x_data, y_data)
+            panel_lines[0].set_data(x_data, y_data)
+
+            # Lines of the compared acquisitions; one with fewer
+            # shots has nothing to draw past its last shot
+            for line, (wave, color) in zip(panel_lines[1:], overlays):
+                if shot < len(wave):
+                    line.set_data(wave[shot, 0, :], wave[shot, 1, :])
+                    x_lim, y_lim = merge_limits(
+                        (x_lim, y_lim), frame_limits(wave[shot, 0, :],
+                                                     wave[shot, 1, :]))
+                else:
+                    line.set_data([], [])
+
+            ax = panel_lines[0].axes
+            ax.set_xlim(xmin=x_lim[0], xmax=x_lim[1])
+            ax.set_ylim(ymin=y_lim[0], ymax=y_lim[1])
+            ax.autoscale(enable=True, axis='x')
+
+        fig.canvas.draw()
+
+        return asarray(fig.canvas.buffer_rgba()).copy()
+
+
+def blit_frame(canvas, rgba):
+    """ Copies a pre-rendered frame onto a tkinter figure canvas
+
+    :param canvas: FigureCanvasTkAgg showing the animated figure
+    :param rgba: Array of the frame from FrameCache
+    :return: True if the frame matched the canvas size and was shown
+    """
+    # Only tkinter canvases can take the bitmap directly
+    if not isinstance(canvas, FigureCanvasTkAgg):
+        return False
+
+    width, height = canvas.get_width_height(physical=True)
+    if rgba.shape[:2] != (height, width):
+        return False
+
+    # The frame replaces the canvas's Agg buffer, which blit() then
+    # copies to the screen
+    frame = asarray(canvas.get_renderer().buffer_rgba())
+    if frame.shape != rgba.shape:
+        return False
+
+    frame[:] = rgba
+    canvas.blit()
+
+    return True
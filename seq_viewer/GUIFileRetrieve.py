@@ -6,14 +6,11 @@
 # during run-time
 from tkinter import IntVar
 
-# Modules for listing and
-# filtering file names
-from os import listdir
-from fnmatch import filter
-
-# Module for reading XML files
-from xml.etree.ElementTree import parse
+# Modules for ordering the XML files and
+# indexing their contents
 from backend_parser import xml_itemize, xml_sort
+from backend_index import ShotIndex
+from backend_archive import archive_load
 
 
 class GetXMLPath:
@@ -36,40 +33,64 @@ class GetXMLPath:
 
         self.waveforms = []
 
+        # Byte-offset index of the directory (see backend_index)
+        self.index = None
+
+        # Full-path to the tar/zip archive the shots were read from,
+        # or None for a directory
+        self.archive = None
+
     def get_xml_list(self, file):
         """ Accepts the file location and checks which naming
         convention is used for the XMLs. Stores naming convention
-        and passes file contents to xml_paths()
+        and passes file contents to xml_paths(). The listing and shot
+        order come from the directory's saved index when it is current.
 
         :param file: Full-path to the user's desired directory
         """
         self.xml_list.append(file)
 
-        # provide the absolute path of the current directory
-        file_loc = self.xml_list[0] + '/'
-        # list all files in the XML directory
-        dir_list = listdir(file_loc)
-
-        # store only XML files
-        if len(filter(dir_list, '*.xml*')) > 1:
-            self.files_in_dir.append(filter(dir_list, '*.xml.*[^0-9]'))
-            self.wont.set(0)
-        elif len(filter(dir_list, '*.xml*')) == 1:
-            self.files_in_dir.append(filter(dir_list, '*.xml*'))
-            self.wont.set(1)
-        elif len(filter(dir_list, '*')) > 0:
-            self.wont.set(2)
-            files = filter(dir_list, '*')
-            for x in files:
-                if parse(file_loc + x):
-                    self.files_in_dir.append(x)
-                else:
-                    continue
+        # A newly chosen directory replaces the files of the last one;
+        # xml_list keeps every directory chosen.
+        self.files_in_dir.clear()
+        self.xml_full_path.clear()
+        self.waveforms.clear()
+        self.archive = None
+
+        # The index lists the directory only if it has no current
+        # manifest, and raises UserWarning if there are no XML files.
+        self.index = ShotIndex.open(file)
+        self.wont.set(self.index.convention)
+
+        if self.wont.get() == 2:
+            self.files_in_dir.extend(self.index.names)
         else:
-            raise UserWarning('Found no XML files or the directory was empty.\n')
+            self.files_in_dir.append(self.index.names)
 
         self.xml_paths(self.files_in_dir, self.wont.get(), file)
 
+    def get_archive_list(self, file):
+        """ Reads the shots of a tar or zip archive without extracting
+        it. Member names are ordered with the same conventions as the
+        files of a directory and the parsed shots are kept in
+        self.waveforms.
+
+        :param file: Full-path to the user's desired archive
+        """
+        self.xml_list.append(file)
+        self.files_in_dir.clear()
+        self.xml_full_path.clear()
+        self.waveforms.clear()
+        self.index = None
+
+        names, roots = archive_load(file)
+
+        self.archive = file
+        self.files_in_dir.extend(names)
+        self.xml_full_path.extend(file + '/' + x for x in names)
+        self.stop_condition = len(names)
+        self.waveforms.append(roots)
+
     def xml_paths(self, chosen_dir, convention, root_dir):
         """ Called by get_xml_list(). Stores naming convention and sorted
         list of full-paths to the XML files in instance variables
@@ -0,0 +1,189 @@
+# Author: Nana K. Owusu
+# This module contains the class that paces the playback of shots.
+# Playback can run as fast as frames can be drawn, at a fixed number of
+# shots per second, or in real time using the repetition time (TR) of
+# each shot. The timer interval is shortened by the measured cost of
+# drawing a frame, and shots are skipped when drawing falls behind.
+
+# Modules for timing #
+from time import perf_counter
+
+# Modules for the real-time schedule #
+from numpy import asarray, concatenate, cumsum, full, median, searchsorted, \
+    int64
+
+
+class PlaybackRate:
+    """ Decides which shot to show next and how long to wait before
+    showing it. It also keeps the achieved and target shot rates.
+    """
+    MODES = ('Max', 'Fixed fps', 'Real time')
+
+    def __init__(self, mode='Fixed fps', fps=1.0):
+        self.mode = mode
+        self.fps = fps
+
+        # Repetition time of each shot in seconds and the time at
+        # which each shot starts, counted from the first shot.
+        self.tr_times = asarray([])
+        self.schedule = asarray([0.0])
+
+        # Sorted shot numbers played when only part of the shots are
+        # shown (quick look). The pace and the rates count positions
+        # in this list; shots passed in and out stay true shot numbers.
+        self.shots = None
+
+        # Wall-clock time, shot and position when playback (re)started
+        self.origin_time = perf_counter()
+        self.origin_shot = 0
+        self.origin_pos = 0
+
+        # Smoothed cost of drawing a frame and achieved rate
+        self.draw_cost = 0.0
+        self.achieved = 0.0
+        self.skipped = 0
+        self.last_time = None
+        self.last_shot = None
+
+    def set_repetition_times(self, tr_list, shot_count, time_scale=1e-6):
+        """ Stores the TR of every shot for real-time playback
+
+        :param tr_list: List of TRs from ssp_end_time()
+        :param shot_count: Integer representing the count of XML files read in
+        :param time_scale: Seconds per unit of the plotter time axis
+        """
+        tr_times = asarray(tr_list, dtype=float)[:shot_count] * time_scale
+
+        # Without any TR there is no real-time schedule; report() says so
+        if not tr_times.size:
+            self.tr_times = tr_times
+            self.schedule = asarray([0.0])
+            return
+
+        # ssp_end_time() does not always find a TR for every shot;
+        # the missing ones take the typical TR.
+        tr_times = concatenate([tr_times, full(shot_count - tr_times.size,
+                                               median(tr_times))])
+
+        self.tr_times = tr_times
+        self.schedule = concatenate([[0.0], cumsum(tr_times)])
+
+    def set_shots(self, shots):
+        """ Limits playback to some of the shots
+
+        :param shots: Sorted array of shot numbers, or None for every shot
+        """
+        self.shots = None if shots is None else asarray(shots, dtype=int64)
+
+    def position(self, shot):
+        # Position of a shot among the played ones; a shot that is not
+        # played counts as the played one before it
+        if self.shots is None:
+            return shot
+
+        return max(int(searchsorted(self.shots, shot, side='right')) - 1, 0)
+
+    def shot_at(self, pos):
+        # True shot number at a position among the played shots
+        return pos if self.shots is None else int(self.shots[pos])
+
+    def restart(self, shot):
+        # Playback (re)starts from this shot now
+        self.origin_time = perf_counter()
+        self.origin_shot = shot
+        self.origin_pos = self.position(shot)
+        self.last_time = None
+        self.last_shot = None
+        self.skipped = 0
+
+    def frames(self, start, stop):
+        """ Generator of the shots to show, skipping the ones whose time
+        has already passed.
+
+        :param start: Integer of the first shot
+        :param stop: Integer of the shot after the last one
+        """
+        if self.shots is None:
+            pos, end = start, stop
+        else:
+            pos = int(searchsorted(self.shots, start))
+            end = int(searchsorted(self.shots, stop))
+
+        if pos >= end:
+            return
+        self.restart(self.shot_at(pos))
+
+        while pos < end:
+            yield self.shot_at(pos)
+
+            due = self.due_position()
+            self.skipped += max(due - pos - 1, 0)
+            pos = max(pos + 1, due)
+
+    def due_position(self):
+        # Position of the shot that should be on display at this moment
+        elapsed = perf_counter() - self.origin_time
+
+        if self.mode == 'Fixed fps':
+            return self.origin_pos + int(elapsed * self.fps)
+        elif self.mode == 'Real time' and self.tr_times.size:
+            start = self.schedule[min(self.origin_shot, self.tr_times.size)]
+            shot = int(searchsorted(self.schedule, start + elapsed,
+                                    side='right')) - 1
+            return self.position(shot)
+        else:
+            return 0
+
+    def target_interval(self, shot):
+        # Seconds between shots if drawing took no time
+        if self.mode == 'Fixed fps':
+            return 1.0 / self.fps
+        elif self.mode == 'Real time' and self.tr_times.size:
+            last = self.tr_times.size - 1
+            pos = self.position(shot)
+            if self.shots is None or pos + 1 >= len(self.shots):
+                return self.tr_times[min(shot, last)]
+
+            # Time from this shot to the next one played
+            return self.schedule[min(self.shot_at(pos + 1), last + 1)] \
+                - self.schedule[min(shot, last + 1)]
+        else:
+            return 0.0
+
+    def target_rate(self, shot):
+        interval = self.target_interval(shot)
+        return 1.0 / interval if interval > 0 else float('inf')
+
+    def frame_drawn(self, shot, cost):
+        """ Records the cost of drawing a shot and updates the rate
+
+        :param shot: Integer of the shot just drawn
+        :param cost: Seconds spent drawing it
+        :return: interval: milliseconds to wait before the next shot
+        """
+        self.draw_cost = 0.8 * self.draw_cost + 0.2 * cost
+
+        # Rates count played shots, i.e. positions
+        pos = self.position(shot)
+        now = perf_counter()
+        if self.last_time is not None and now > self.last_time:
+            rate = max(pos - self.last_shot, 1) / (now - self.last_time)
+            self.achieved = 0.8 * self.achieved + 0.2 * rate if self.achieved \
+                else rate
+        self.last_time, self.last_shot = now, pos
+
+        wait = self.target_interval(shot) - self.draw_cost
+
+        return max(int(wait * 1000), 1)
+
+    def report(self, shot):
+        # Text for the control bar
+        target = self.target_rate(shot)
+        target_txt = 'max' if target == float('inf') else '{0:.1f}'.format(target)
+
+        # Real time falls back to the pace of 'Max' until TRs are read
+        if self.mode == 'Real time' and not self.tr_times.size:
+            target_txt = 'max (no TRs)'
+
+        return "Rate: {0:.1f}/{1} shots/s, skipped {2}".format(
+            self.achieved, target_txt, self.skipped)
@@ -4,19 +4,31 @@
 # by tkinter events in the ViewerGUI module.
 
 # Modules for GUI #
-from tkinter import StringVar
-from tkinter.ttk import Button
+from tkinter import StringVar, IntVar
+from tkinter.ttk import Button, Scale, Entry, Combobox, Spinbox, Label
+
+# Modules for the table of axis limits #
+from numpy import empty, nan, isnan, where, nan_to_num, fmin, fmax
 
 # Modules for extracting waveforms #
 from backend_exciters import ssp_end_time, extract_wfm, scale_time, \
     wave_truncate
+from backend_compact import CompactWave
+
+# Modules for pre-rendering shots #
+from FrameCache import FrameCache, FrameLayout, blit_frame, draw_envelope
 
-# Modules for finding min and #
-# max of an array object #
-from numpy import amin, amax
+# Modules for pacing the playback #
+from time import perf_counter
+from PlaybackControl import PlaybackRate
 
-# Module for animation #
+# Modules for animation and axes layout #
 from matplotlib.animation import TimedAnimation
+from matplotlib.gridspec import GridSpec
+
+# Colours of the lines of compared acquisitions, in the order added
+OVERLAY_COLORS = ('tab:orange', 'tab:green', 'tab:red', 'tab:purple',
+                  'tab:brown')
 
 
 def wave_to_plot(wave, t):
@@ -26,12 +38,14 @@ def wave_to_plot(wave, t):
     return x, y
 
 
-def board_waveform(waveforms, board_num, shot_count):
+def board_waveform(waveforms, board_num, shot_count, compact=False):
     """ Extracts relevant x and y information to be plotted
 
     :param waveforms: ElementTree object for sequencer chosen
     :param board_num: Integer representing sequencer board number (0-7)
     :param shot_count: Integer representing the count of XML files read in
+    :param compact: Store times as integer ticks and amplitudes at low
+    precision (see backend_compact)
     :return: Array of exciter/sequencer information for all shots
     """
     ssp_endings = ssp_end_time(waveforms, shot_count)
@@ -41,15 +55,39 @@ def board_waveform(waveforms, board_num, shot_count):
 
     xtr = wave_truncate(wave, idx_to_cut, shot_count)
 
+    if compact:
+        return CompactWave.from_wave(xtr)
+
     return xtr
 
 
+def shot_limits(wave, start, stop):
+    """ Axis limits of a range of shots computed in one pass
+
+    :param wave: Array of exciter/sequencer information for all shots
+    :param start: Integer of the first shot in the range
+    :param stop: Integer of the shot after the last one in the range
+    :return: Array of [[x_min, x_max], [y_min, y_max]] for each shot
+    """
+    limits = empty((stop - start, 2, 2))
+
+    # Missing values (NaN) are skipped, as in frame_limits()
+    limits[:, :, 0] = nan_to_num(fmin.reduce(wave[start:stop], axis=2))
+    limits[:, :, 1] = nan_to_num(fmax.reduce(wave[start:stop], axis=2))
+
+    # Flat shots get a unit range, as in frame_limits()
+    limits[:, :, 1] = where(limits[:, :, 0] == limits[:, :, 1],
+                            limits[:, :, 0] + 1, limits[:, :, 1])
+
+    return limits
+
+
 class ShotAnimator(TimedAnimation):
     """ Class that controls the animation of sequencer boards
     the user chooses. It allows for repeated play as well as
     single step incrementing and decrementing.
     """
-    def __init__(self, fig):
+    def __init__(self, fig, cache_limit=256, pool_size=8, row_height=2.25):
         # Instance variables for storing plotting
         # information. With exception to self.fig,
         # most of the variables will be filled in
@@ -64,6 +102,16 @@ class ShotAnimator(TimedAnimation):
         self.shot_label = object()
         self.board_names = dict()
 
+        # Instance variables for the pool of board axes. Axes are
+        # created once and shown, hidden and repacked on toggling.
+        # resize_hook is called with the count of visible boards so
+        # the GUI can scale the canvas to match.
+        self.axes_pool = []
+        self.pool_lines = dict()
+        self.board_order = dict()
+        self.row_height = row_height
+        self.resize_hook = None
+
         # Instance variables for stopping the animation
         self.pause = False
         self.stop_btn = object()
@@ -71,12 +119,60 @@ class ShotAnimator(TimedAnimation):
 
         # Instance variable for stepping the animation
         # forward and backward
-        self.step_up_dwn = object()
         self.frame_seq = object()
         self.current_frame = None
 
+        # Instance variables for jumping to any shot. Axis limits
+        # are prepared for a window of shots around each jump.
+        self.seek_pos = IntVar()
+        self.seek_bar = object()
+        self.seek_txt = StringVar()
+        self.limit_table = dict()
+        self.prefetch_window = 32
+
+        # Instance variables for the envelope of all shots drawn
+        # behind a board's line
+        self.envelopes = dict()
+        self.envelope_art = dict()
+
+        # Instance variables for the same board of other acquisitions
+        # drawn over a board's line: lists of (wave, colour) and of
+        # the lines drawing them
+        self.overlays = dict()
+        self.overlay_lines = dict()
+
+        # Instance variables for the pre-rendered frames. The flag
+        # tells axis limit changes made while drawing a shot apart
+        # from the ones made by zooming.
+        self.frame_cache = FrameCache(memory_limit=cache_limit)
+        self.drawing = False
+
+        # Instance variables for the playback rate. tr_source is
+        # set to a callable returning the TR of each shot once a
+        # directory has been read.
+        self.playback = PlaybackRate(mode='Fixed fps', fps=1.0)
+        self.tr_source = None
+        self.rate_mode = StringVar()
+        self.rate_fps = StringVar()
+        self.rate_txt = StringVar()
+
+        # Sorted array of the shots played back after a quick look
+        # (see backend_quicklook), or None to play every shot. Other
+        # shots are still reached by seeking and stepping.
+        self.shot_subset = None
+
         TimedAnimation.__init__(self, self.fig, interval=1000, blit=False)
 
+        for idx in range(pool_size):
+            ax = self.fig.add_subplot(pool_size, 1, idx + 1)
+            self.pool_lines[ax] = ax.plot([], [], 'b-', lw=1)
+            ax.callbacks.connect('xlim_changed', self.zoom_changed)
+            ax.callbacks.connect('ylim_changed', self.zoom_changed)
+            ax.set_visible(False)
+            self.axes_pool.append(ax)
+
+        self.fig.canvas.mpl_connect('resize_event', self.refresh_cache)
+
     def _stop(self, *args):
         # Stops the animation
         self.event_source.stop()
@@ -92,6 +188,7 @@ class ShotAnimator(TimedAnimation):
         self.current_frame = framedata
         self._drawn_artists = []
         self.boards_picked = list(self.boards_to_animate.keys())
+        self.drawing = True
 
         # Update label showing the current shot number
         self.shot_label.config(textvariable=self.label_txt.
@@ -101,14 +198,12 @@ class ShotAnimator(TimedAnimation):
         for board in self.boards_picked:
             x_data, y_data = wave_to_plot(self.boards_to_animate[board], self.current_frame)
 
-            y_lim = [amin(y_data, axis=0), amax(y_data, axis=0)]
-            x_lim = [amin(x_data, axis=0), amax(x_data, axis=0)]
-
-            if y_lim[0] == y_lim[1]:
-                y_lim[1] = y_lim[0] + 1
-
-            if x_lim[0] == x_lim[1]:
-                x_lim[1] = x_lim[0] + 1
+            limits = self.limit_table[board][self.current_frame]
+            if isnan(limits[0, 0]):
+                x_lim, y_lim = self.board_limits(board, self.current_frame,
+                                                 self.current_frame + 1)[0]
+            else:
+                x_lim, y_lim = limits
 
             self.axes_to_animate[board].set_xlim(xmin=x_lim[0], xmax=x_lim[1])
             self.axes_to_animate[board].set_ylim(ymin=y_lim[0], ymax=y_lim[1])
@@ -118,41 +213,278 @@ class ShotAnimator(TimedAnimation):
 
             self.line_of_axes[board][0].set_data(x_data, y_data)
 
+            for line, (wave, color) in zip(self.overlay_lines.get(board, []),
+                                           self.overlays.get(board, [])):
+                if self.current_frame < len(wave):
+                    line.set_data(*wave_to_plot(wave, self.current_frame))
+                else:
+                    line.set_data([], [])
+
         self._drawn_artists.append(self.line_of_axes.values())
+        self.seek_pos.set(framedata)
+        self.drawing = False
 
     def _draw_next_frame(self, framedata, blit):
-        self._draw_frame(framedata)
-        self._post_draw(framedata)
+        # Called by the timer during playback. The next timer interval
+        # is shortened by the time it took to draw this shot, so a miss
+        # is rendered here rather than left to draw_idle.
+        draw_start = perf_counter()
+        self.show_frame(framedata, direction=1, render=True)
+
+        self._interval = self.playback.frame_drawn(framedata,
+                                                   perf_counter() - draw_start)
+        self.rate_txt.set(self.playback.report(framedata))
 
     def draw_prev_frame(self, framedata):
         self._drawn_artists.clear()
+        self.show_frame(framedata, direction=-1)
+
+    def show_frame(self, framedata, direction=1, render=False):
+        """ Displays a shot, copying the pre-rendered bitmap onto the
+        canvas when the frame cache holds one and drawing it otherwise.
+
+        :param framedata: Integer of the shot to display
+        :param direction: 1 when stepping forward and -1 when backward
+        :param render: Draw a shot missing from the cache before
+        returning instead of scheduling the draw
+        """
+        rgba = self.frame_cache.get(framedata)
+
+        # The figure artists are still updated so that a later full
+        # redraw (e.g. from the toolbar) shows the same shot.
         self._draw_frame(framedata)
-        self._post_draw(framedata)
 
-    def new_frame_seq(self):
+        shown = rgba is not None and blit_frame(self.fig.canvas, rgba)
+        if not shown and render:
+            self.fig.canvas.draw()
+        elif not shown:
+            self._post_draw(framedata)
+
+        self.frame_cache.prefetch(framedata, direction)
+
+    def refresh_cache(self, *args):
+        """ Drops the pre-rendered frames and restarts the renderer
+        with the boards and figure size currently on display.
+        """
+        layout = None
+        if self.axes_to_animate:
+            layout = FrameLayout(self.fig, self.boards_to_animate,
+                                 self.axes_to_animate, self.board_names,
+                                 self.envelopes, self.overlays)
+
+        self.frame_cache.invalidate(layout, self.shot_len)
+
+    def zoom_changed(self, ax):
+        # Limit changes not made by _draw_frame come from the
+        # navigation toolbar, which makes the cached frames stale.
+        if not self.drawing:
+            self.refresh_cache()
+
+    def new_frame_seq(self, start=0):
         """Returns an iterator which determines how long the
         long sequencer data is and how long till the
         sequence repeats
         """
-        return iter(range(self.shot_len))
+        # With a subset the pace applies to its shots, so playback
+        # moves from one of them to the next at the chosen rate
+        self.playback.set_shots(self.shot_subset)
+
+        return self.playback.frames(start, self.shot_len)
 
     def add_shots(self, board, exciter_data):
         self.boards_to_animate[board] = exciter_data
 
+        self.limit_table[board] = empty((self.shot_len, 2, 2))
+        self.limit_table[board].fill(nan)
+        self.prepare_window(self.current_frame or 0)
+
     def remove_shots(self, board):
         self.boards_to_animate.pop(board)
+        self.limit_table.pop(board)
+
+    def prepare_window(self, shot):
+        """ Fills the axis limits of the shots around the given one
+        and asks the frame cache to render them.
+
+        :param shot: Integer of the shot being jumped to
+        """
+        start = max(shot - self.prefetch_window, 0)
+        stop = min(shot + self.prefetch_window + 1, self.shot_len)
+
+        for board, limits in self.limit_table.items():
+            missing = isnan(limits[start:stop, 0, 0]).nonzero()[0]
+            if missing.size == 0:
+                continue
+
+            first, last = start + missing[0], start + missing[-1] + 1
+            limits[first:last] = self.board_limits(board, first, last)
+
+        self.frame_cache.prefetch(shot)
+
+    def board_limits(self, board, start, stop):
+        """ Axis limits of a range of shots of a board, widened to
+        take in the lines of compared acquisitions.
+
+        :param board: Key of the board in boards_to_animate
+        :param start: Integer of the first shot in the range
+        :param stop: Integer of the shot after the last one in the range
+        :return: Array of [[x_min, x_max], [y_min, y_max]] for each shot
+        """
+        limits = shot_limits(self.boards_to_animate[board], start, stop)
+
+        for wave, color in self.overlays.get(board, []):
+            last = min(stop, len(wave))
+            if last <= start:
+                continue
+
+            other = shot_limits(wave, start, last)
+            count = last - start
+            limits[:count, :, 0] = fmin(limits[:count, :, 0], other[:, :, 0])
+            limits[:count, :, 1] = fmax(limits[:count, :, 1], other[:, :, 1])
+
+        return limits
+
+    def seek(self, shot):
+        """ Jumps straight to a shot. Playback, if running, carries
+        on from the shot after it.
+
+        :param shot: Integer of the shot to display
+        """
+        if self.shot_len == 0:
+            return
+
+        shot = min(max(int(shot), 0), self.shot_len - 1)
+        direction = -1 if shot < (self.current_frame or 0) else 1
+
+        self.prepare_window(shot)
+        self.frame_seq = self.new_frame_seq(start=shot + 1)
+        self.show_frame(shot, direction)
 
     def add_subplot(self, board, idx, name):
-        self.axes_to_animate[board] = self.fig.add_subplot(8, 1, idx)
-        self.line_of_axes[board] = self.axes_to_animate[board].plot([], [], 'b-', lw=1)
+        """ Shows an axis from the pool for a board
+
+        :param board: Key of the board
+        :param idx: Integer placing the board top to bottom (its number)
+        :param name: Name of the board for the axis title
+        """
+        if board in self.axes_to_animate:
+            return
+
+        ax = self.axes_pool.pop(0)
+        ax.set_visible(True)
 
+        self.axes_to_animate[board] = ax
+        self.line_of_axes[board] = self.pool_lines[ax]
+        self.board_order[board] = idx
         self.board_names[board] = name
 
+        self.repack()
+
     def remove_subplot(self, board):
-        self.fig.delaxes(self.axes_to_animate[board])
-        self.axes_to_animate.pop(board)
+        self.remove_envelope(board)
+        self.set_overlays(board, [])
+
+        ax = self.axes_to_animate.pop(board)
+        self.line_of_axes.pop(board)[0].set_data([], [])
+        ax.set_visible(False)
+        self.axes_pool.append(ax)
+
+        self.board_order.pop(board)
         self.board_names.pop(board)
 
+        self.repack()
+
+    def repack(self):
+        """ Stacks the visible board axes top to bottom in board
+        order and sizes the figure to the number of boards shown.
+        """
+        shown = sorted(self.axes_to_animate, key=lambda x: self.board_order[x])
+        rows = max(len(shown), 1)
+
+        # Margins are kept at a fixed size in inches
+        height = rows * self.row_height
+        params = self.fig.subplotpars
+        grid = GridSpec(rows, 1, figure=self.fig, hspace=1.0,
+                        left=params.left, right=params.right,
+                        top=1.0 - 0.45 / height, bottom=0.35 / height)
+
+        self.drawing = True
+        self.fig.set_size_inches(self.fig.get_size_inches()[0], height,
+                                 forward=False)
+        for row, board in enumerate(shown):
+            ax = self.axes_to_animate[board]
+            ax.set_subplotspec(grid[row])
+            ax.set_position(grid[row].get_position(self.fig))
+        self.drawing = False
+
+        if self.resize_hook is not None:
+            self.resize_hook(rows)
+
+        self.refresh_cache()
+        self.fig.canvas.draw_idle()
+
+    def add_envelope(self, board, grid, stats):
+        """ Shows the envelope and mean of all shots behind the line
+        of a board that is on display.
+
+        :param board: Key of the board in axes_to_animate
+        :param grid: Array of the common time grid
+        :param stats: ShotStatistics of the board from board_statistics()
+        """
+        if board not in self.axes_to_animate:
+            return
+
+        self.remove_envelope(board)
+
+        self.drawing = True
+        self.envelopes[board] = (grid, stats)
+        self.envelope_art[board] = draw_envelope(self.axes_to_animate[board],
+                                                 grid, stats)
+        self.drawing = False
+
+        self.refresh_cache()
+        self.fig.canvas.draw_idle()
+
+    def remove_envelope(self, board):
+        for artist in self.envelope_art.pop(board, []):
+            artist.remove()
+
+        if self.envelopes.pop(board, None) is not None:
+            self.refresh_cache()
+            self.fig.canvas.draw_idle()
+
+    def set_overlays(self, board, waves):
+        """ Draws the same board of other acquisitions over the line
+        of a board that is on display, replacing any drawn before.
+
+        :param board: Key of the board in axes_to_animate
+        :param waves: List of waveforms aligned with the board's shots;
+        an empty list removes the overlays
+        """
+        for line in self.overlay_lines.pop(board, []):
+            line.remove()
+        changed = self.overlays.pop(board, None) is not None
+
+        if board in self.axes_to_animate and waves:
+            ax = self.axes_to_animate[board]
+            self.overlays[board] = [(wave, OVERLAY_COLORS[idx % len(OVERLAY_COLORS)])
+                                    for idx, wave in enumerate(waves)]
+            self.overlay_lines[board] = [ax.plot([], [], '-', color=color,
+                                                 lw=1)[0]
+                                         for wave, color in self.overlays[board]]
+            changed = True
+
+        if not changed:
+            return
+
+        # Limits computed so far did not cover the new lines
+        if board in self.limit_table:
+            self.limit_table[board].fill(nan)
+            self.prepare_window(self.current_frame or 0)
+
+        self.refresh_cache()
+        self.fig.canvas.draw_idle()
+
     def stop_button(self, some_frame):
         self.display_state.set("Stop")
         self.stop_btn = Button(some_frame, textvariable=self.display_state,
@@ -169,6 +501,75 @@ class ShotAnimator(TimedAnimation):
                               command=lambda: self.backward())
         step_dwn_btn.pack(side="right", anchor="sw", fill="x")
 
+    def seek_slider(self, some_frame):
+        self.seek_bar = Scale(some_frame, from_=0, to=0, orient="horizontal",
+                              variable=self.seek_pos,
+                              command=lambda value: self.slider_moved(value))
+        self.seek_bar.pack(side="right", anchor="sw", fill="x", expand=True)
+
+    def seek_entry(self, some_frame):
+        go_btn = Button(some_frame, text="Go to shot",
+                        command=lambda: self.seek_typed())
+        go_btn.pack(side="right", anchor="sw", fill="x")
+
+        seek_box = Entry(some_frame, textvariable=self.seek_txt, width=7)
+        seek_box.bind("<Return>", lambda event: self.seek_typed())
+        seek_box.pack(side="right", anchor="sw", fill="x")
+
+    def seek_range(self, shot_count):
+        # Called once the shot count is known
+        self.seek_bar.config(to=max(shot_count - 1, 0))
+
+    def slider_moved(self, value):
+        # The slider reports fractional positions while dragging
+        shot = int(round(float(value)))
+        if not self.drawing and shot != self.current_frame:
+            self.seek(shot)
+
+    def seek_typed(self):
+        try:
+            shot = int(self.seek_txt.get())
+        except ValueError:
+            return
+
+        self.seek(shot)
+
+    def rate_controls(self, some_frame):
+        rate_label = Label(some_frame, textvariable=self.rate_txt)
+        rate_label.pack(side="right", anchor="sw", fill="x")
+
+        self.rate_fps.set("{0:g}".format(self.playback.fps))
+        fps_box = Spinbox(some_frame, from_=0.1, to=120.0, increment=1.0,
+                          textvariable=self.rate_fps, width=5,
+                          command=lambda: self.rate_changed())
+        fps_box.bind("<Return>", lambda event: self.rate_changed())
+        fps_box.pack(side="right", anchor="sw", fill="x")
+
+        self.rate_mode.set(self.playback.mode)
+        mode_box = Combobox(some_frame, values=PlaybackRate.MODES,
+                            textvariable=self.rate_mode, state="readonly",
+                            width=9)
+        mode_box.bind("<<ComboboxSelected>>", lambda event: self.rate_changed())
+        mode_box.pack(side="right", anchor="sw", fill="x")
+
+    def rate_changed(self):
+        try:
+            fps = float(self.rate_fps.get())
+        except ValueError:
+            fps = self.playback.fps
+
+        if fps > 0:
+            self.playback.fps = fps
+        self.playback.mode = self.rate_mode.get()
+
+        # The TRs are only read from the SSP board when first needed
+        if self.playback.mode == 'Real time' and not self.playback.tr_times.size \
+                and self.tr_source is not None:
+            self.playback.set_repetition_times(self.tr_source(), self.shot_len)
+
+        self.playback.restart(self.current_frame or 0)
+        self.rate_txt.set(self.playback.report(self.current_frame or 0))
+
     def pause_play(self, event=None):
         if not self.pause:
             self.pause = True
@@ -178,51 +579,16 @@ class ShotAnimator(TimedAnimation):
         else:
             self.pause = False
             self.display_state.set("Stop")
+            self.playback.restart(self.current_frame or 0)
             self._start()
             self.stop_btn.config(textvariable=self.display_state)
 
     def forward(self):
-        self.step_up_dwn.index = self.current_frame
-        next_frame = self.step_up_dwn.next()
-
-        self.shot_label.config(textvariable=self.label_txt.
-                               set("Shot #: {0}/{1}".format(next_frame,
-                                                            self.shot_len)))
-        self._draw_next_frame(next_frame, blit=False)
+        if self.current_frame is None:
+            self.seek(0)
+        else:
+            self.seek(self.current_frame + 1)
 
     def backward(self):
-        self.step_up_dwn.index = self.current_frame
-        prev_frame = self.step_up_dwn.prev()
-
-        self.shot_label.config(textvariable=self.label_txt.
-                               set("Shot #: {0}/{1}".format(prev_frame,
-                                                            self.shot_len)))
-        self.draw_prev_frame(prev_frame)
-
-
-class PrevNextIterator:
-    """ Copied from
-    https://tinyurl.com/y9egntu7
-    This class allows for the increment and decrement of
-    a list or tuple of integers.
-    """
-    def __init__(self, collection=None):
-        self.collection = None or collection
-        self.index = 0
-
-    def next(self):
-        try:
-            self.index += 1
-            result = self.collection[self.index]
-        except IndexError:
-            raise StopIteration
-        return result
-
-    def prev(self):
-        self.index -= 1
-        if self.index < 0:
-            raise StopIteration
-        return self.collection[self.index]
-
-    def __iter__(self):
-        return self
+        if self.current_frame is not None:
+            self.seek(self.current_frame - 1)
@@ -5,9 +5,10 @@
 
 # Modules for GUI
 from os import getcwd
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import Tk, Frame, Checkbutton, IntVar, StringVar, \
     Entry, Canvas, Label, filedialog
-from tkinter.ttk import Button, LabelFrame, Scrollbar
+from tkinter.ttk import Button, LabelFrame, Scrollbar, Combobox
 
 # Modules for interactive plotting in GUI
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg as FigCanvas
@@ -15,9 +16,18 @@ from matplotlib.backends.backend_tkagg import NavigationToolbar2Tk as NavTb2
 from matplotlib.figure import Figure, SubplotParams
 
 # Custom modules for plotting setting and extracting xml info
-from PlotAnimator import board_waveform, ShotAnimator, PrevNextIterator
+from PlotAnimator import board_waveform, ShotAnimator
 from GUIFileRetrieve import GetXMLPath
-from backend_parser import xml_root
+from WaterfallView import WaterfallView
+from AnalyticsTable import AnalyticsTable
+from EventTimeline import EventTimeline
+from backend_resample import board_statistics
+from backend_compact import CompactWave
+from backend_multi import AcquisitionSet, align_shots
+from dataset_server import DatasetClient
+from backend_exciters import ssp_end_time
+from backend_archive import is_archive
+from backend_quicklook import QuickLook, pick_shots
 
 
 def get_file(window):
@@ -33,6 +43,34 @@ def get_file(window):
     return file_loc
 
 
+def slice_text(text):
+    """ Reads a shot range typed as in a slice, e.g. '100:2000:10'
+    :param text: String of up to three integers separated by ':'
+    :return: start, stop, stride: integers, or None where left out
+    """
+    if text.count(':') > 2:
+        raise ValueError('A shot range has at most two colons.')
+
+    parts = [x.strip() for x in text.split(':')] + ['', '']
+    start, stop, stride = [int(x) if x else None for x in parts[:3]]
+
+    return start or 0, stop, stride or 1
+
+
+def get_archive(window):
+    """ Pick a tar or zip archive of XML files
+    :param window: Tk Frame object
+    :return: file_loc: string containing the full path to the archive
+    """
+    file_loc = filedialog.askopenfilename(
+        parent=window, initialdir=getcwd(),
+        title="Please select the archive of XML files",
+        filetypes=[("Archives", "*.tar *.tar.gz *.tgz *.tar.bz2 *.tar.xz *.zip"),
+                   ("All files", "*")])
+
+    return file_loc
+
+
 class CheckBar(Frame):
     """ Tkinter based class for generating a row of check-buttons
     which a user can select. The methods used to generate the plots
@@ -52,6 +90,19 @@ class CheckBar(Frame):
         self.board_num = IntVar()
         self.boards_shown = 0
 
+        # Set to 1 to keep waveforms in the compact (tick/float32) form
+        self.compact = IntVar()
+        self.compact.set(0)
+
+        # How boards of compared directories are shown: drawn over
+        # the board ("Overlay") or subtracted from it ("Difference")
+        self.compare_mode = StringVar()
+        self.compare_mode.set("Overlay")
+        self.compare_txt = StringVar()
+
+        # Waveforms read for each board on display, before comparison
+        self.board_data = dict()
+
         self.fig = object()
         self.cnv = object()
         self.label_txt = object()
@@ -82,23 +133,115 @@ class CheckBar(Frame):
             board.set(1)
             self.boards_shown += 1
             shot_data = self.data_gen(id_num)
+            self.board_data[id_num] = shot_data
             self.animator_obj.add_shots(self.check_btn[id_num], shot_data)
-            self.animator_obj.add_subplot(self.check_btn[id_num], self.boards_shown,
+            self.animator_obj.add_subplot(self.check_btn[id_num], id_num,
                                           self.boards[id_num])
+            self.compare(id_num)
             self.play_choice()
 
         else:
             board.set(0)
             self.boards_shown -= 1
+            self.board_data.pop(id_num, None)
             self.animator_obj.remove_shots(self.check_btn[id_num])
             self.animator_obj.remove_subplot(self.check_btn[id_num])
 
     def data_gen(self, board_num):
-        # Provides the x, y information from all shot for a board
+        # Provides the x, y information from all shot for a board,
+        # from the dataset server when the viewer is connected to one
+        if self.xml_info.get("quick") is not None:
+            # Quick look: only some shots are read, the rest on demand
+            return self.xml_info["quick"].board(board_num)
+
+        if self.xml_info.get("client") is not None:
+            exciter_data = self.xml_info["client"].board_waveform(
+                self.xml_info["directory"], board_num)
+            if self.compact.get() == 1:
+                exciter_data = CompactWave.from_wave(exciter_data)
+            return exciter_data
+
+        if self.xml_info.get("index") is not None:
+            # Only the board's slice of each file is read
+            exciter_data = self.xml_info["index"].board_waveform(board_num)
+            if self.compact.get() == 1:
+                exciter_data = CompactWave.from_wave(exciter_data)
+            return exciter_data
+
         exciter_data = board_waveform(self.xml_info["waveforms"][0], board_num,
-                                      self.xml_info["xml_count"])
+                                      self.xml_info["xml_count"],
+                                      compact=self.compact.get() == 1)
         return exciter_data
 
+    def compare_gen(self, board_num):
+        # The board from every compared directory that has finished
+        # loading, lined up with the shots of the chosen directory
+        acquisitions = self.xml_info.get("compare")
+        if acquisitions is None:
+            return []
+
+        waves, errors = acquisitions.boards(board_num, loaded_only=True)
+        if errors:
+            directory, err = errors[0]
+            self.compare_txt.set("{0}: {1}".format(
+                directory, str(err) or type(err).__name__))
+
+        return [align_shots(wave, self.xml_info["xml_count"])
+                for wave in waves]
+
+    def compare(self, board_num):
+        """ Shows a board on display against the compared directories,
+        either as extra lines or as the difference of each shot.
+
+        :param board_num: Integer representing sequencer board number (0-7)
+        """
+        if board_num not in self.board_data:
+            return
+
+        shot_data = self.board_data[board_num]
+        others = self.compare_gen(board_num)
+
+        if others and self.compare_mode.get() == "Difference":
+            # Resampling every shot takes a while; the board is redrawn
+            # once the worker is done
+            job = self.xml_info["compare"].difference(shot_data, others)
+            self.after(100, self.difference_ready, board_num, shot_data, job)
+            return
+
+        self.show_compared(board_num, shot_data, others, self.boards[board_num])
+
+    def difference_ready(self, board_num, shot_data, job):
+        if not job.done():
+            self.after(100, self.difference_ready, board_num, shot_data, job)
+            return
+
+        # The board was turned off, read again or the mode changed
+        if self.board_data.get(board_num) is not shot_data \
+                or self.compare_mode.get() != "Difference":
+            return
+
+        try:
+            differences = job.result()
+        except Exception as err:
+            self.compare_txt.set(str(err) or type(err).__name__)
+            return
+
+        self.show_compared(board_num, differences[0], differences[1:],
+                           self.boards[board_num] + " difference")
+
+    def show_compared(self, board_num, shot_data, others, name):
+        board = self.check_btn[board_num]
+
+        self.animator_obj.board_names[board] = name
+        if shot_data is not self.animator_obj.boards_to_animate[board]:
+            self.animator_obj.add_shots(board, shot_data)
+            self.animator_obj.refresh_cache()
+        self.animator_obj.set_overlays(board, others)
+
+    def compare_all(self, event=None):
+        for board_num in list(self.board_data):
+            self.compare(board_num)
+
     def play_choice(self):
         iterator = self.animator_obj.new_frame_seq()
         self.animator_obj.pause = False
@@ -129,6 +272,12 @@ class Scrollable(Frame):
         self.frame = frame
         self.fig = fig
 
+        # Count of board axes on display; the figure is made as tall
+        # as that many rows rather than always as tall as all 8.
+        self.rows = 1
+        self.view_width = 1
+        self.view_height = 1
+
         # Instance variable for tkinter canvas
         self.tk_cnv = Canvas(self.frame, highlightthickness=0)
         self.tk_cnv.pack(side="left", anchor="nw", fill="both", expand=True)
@@ -169,12 +318,24 @@ class Scrollable(Frame):
 
     def __fill_canvas(self, event):
         """update the scrollbars to match the size of the inner frame"""
-        # Enlarge the windows item to the canvas width
-        canvas_width = event.width
-        canvas_height = event.height * 2.825
+        self.view_width = event.width
+        self.view_height = event.height
+        self.resize_window()
+
+    def set_rows(self, rows):
+        """Scale the figure height to the count of boards shown"""
+        self.rows = rows
+        self.resize_window()
+
+    def resize_window(self):
+        # Enlarge the windows item to the canvas width; eight rows
+        # span 2.825 canvas heights.
+        canvas_width = self.view_width
+        canvas_height = self.view_height * 2.825 * self.rows / 8
 
         self.tk_cnv.itemconfig(self.windows_item, width=canvas_width,
                                height=canvas_height)
+        self.tk_cnv.config(scrollregion=self.tk_cnv.bbox("all"))
 
     def update_canvas(self):
         """Update the canvas and the scroll-region"""
@@ -195,6 +356,11 @@ class StartPage(Frame):
         self.controller = controller
         self.window = parent
 
+        # -Dataset server that parses the files, if one was given
+        self.client = None
+        if getattr(controller, "server", None):
+            self.client = DatasetClient(controller.server)
+
         # Instance variables for widgets showing/picking user's desired #
         # directory.                                                    #
         self.entry_frame = Frame(self.controller, relief="raised", height=15)
@@ -206,6 +372,26 @@ class StartPage(Frame):
         self.xml_dir = StringVar(self.controller)
         self.xml_dir.set(getcwd())
 
+        # -Directories compared with the chosen one, loaded by a
+        # shared pool of workers
+        self.acquisitions = AcquisitionSet(workers=4, client=self.client)
+        self.compare_txt = StringVar(self.controller)
+        self.compare_txt.set("Compared: 0")
+        self.compare_mode = StringVar(self.controller)
+        self.compare_mode.set("Overlay")
+
+        # -Quick look at part of the shots: on/off, a shot range as
+        # in a slice and the count of outlying shots to add
+        self.quick = None
+        self.quick_on = IntVar(self.controller)
+        self.quick_on.set(0)
+        self.quick_range = StringVar(self.controller)
+        self.quick_range.set("::10")
+        self.quick_outliers = StringVar(self.controller)
+        self.quick_outliers.set("0")
+        self.quick_txt = StringVar(self.controller)
+        self.quick_widgets = []
+
         self.user_choice()
 
         # -Object that contains XML paths and file counts
@@ -224,24 +410,24 @@ class StartPage(Frame):
         self.board_options = CheckBar(self.checkbox_frame, picks=self.seq_list)
         self.show_options()
 
+        # -Event handler for the shots x time overview of a board
+        self.waterfall_board = StringVar(self.controller)
+        self.waterfall_board.set(self.seq_list[0])
+        self.stats_pool = ThreadPoolExecutor(max_workers=1)
+        self.waterfall_setup()
+
         # Instance variable for Scrollable frame widgets #
         self.canvas_frame = Frame(self.controller, relief="sunken")
         self.canvas_frame.pack(side="top", anchor="nw", padx=2, pady=2, fill="both",
                                expand=True)
 
         # -Instance variables for the figure to be populated
+        # The height follows the count of boards shown (see
+        # ShotAnimator.repack).
         params = SubplotParams(left=0.25, right=0.95, top=0.98, bottom=0.02)
-        self.plot_fig = Figure(figsize=[14.0, 18.0], subplotpars=params,
+        self.plot_fig = Figure(figsize=[14.0, 2.25], subplotpars=params,
                                constrained_layout=False)
 
-        self.plot_fig.subplots_adjust(hspace=1.0)
-
-        # -Setup for changing the size of the axes in the plot
-        widths = [1]
-        heights = self.get_repeat_list([0.65], 8)
-        self.plot_fig.add_gridspec(nrows=8, ncols=1, width_ratios=widths,
-                                   height_ratios=heights)
-
         # -Instance variable for the frame with scrolling functionality
         self.canvas_body = Scrollable(self.canvas_frame, self.plot_fig)
         self.mpl_canvas = self.canvas_body.mpl_cnv
@@ -261,14 +447,14 @@ class StartPage(Frame):
 
         self.canvas_setup()
         self.animator = ShotAnimator(self.plot_fig)
+        self.animator.resize_hook = self.canvas_body.set_rows
         self.animator.step_up_button(self.control_frame)
         self.animator.stop_button(self.control_frame)
         self.animator.step_dwn_button(self.control_frame)
         self.show_shot_num.pack(side="right", anchor="sw", fill="x")
-
-    @staticmethod
-    def get_repeat_list(list_2_repeat, num_of_times):
-        return [num for num in list_2_repeat for i in range(num_of_times)]
+        self.animator.seek_entry(self.control_frame)
+        self.animator.rate_controls(self.control_frame)
+        self.animator.seek_slider(self.control_frame)
 
     def user_choice(self):
         # Clear the Entry widget
@@ -279,12 +465,165 @@ class StartPage(Frame):
                         command=lambda: self.file_name())
         choice.pack(side="left")
 
+        archive = Button(self.entry_frame, text="Select archive",
+                         command=lambda: self.file_name(archive=True))
+        archive.pack(side="left")
+
+        self.compare_setup()
+        self.quick_setup()
+
         self.choice_display.pack(side="top", fill="x", expand=True)
 
+    def quick_setup(self):
+        # Widgets for loading a subset of the shots first
+        quick_btn = Checkbutton(self.entry_frame, text="Quick look, shots",
+                                variable=self.quick_on)
+        quick_btn.pack(side="left")
+
+        range_entry = Entry(self.entry_frame, textvariable=self.quick_range,
+                            width=12)
+        range_entry.pack(side="left")
+
+        outlier_label = Label(self.entry_frame, text="+ outliers")
+        outlier_label.pack(side="left")
+
+        outlier_entry = Entry(self.entry_frame, textvariable=self.quick_outliers,
+                              width=4)
+        outlier_entry.pack(side="left")
+
+        quick_label = Label(self.entry_frame, textvariable=self.quick_txt)
+        quick_label.pack(side="left")
+
+        self.quick_widgets = [quick_btn, range_entry, outlier_entry]
+
+        # Shots read by a dataset server are always loaded in full
+        if self.client is not None:
+            self.quick_allowed(False, "(not with a server)")
+
+    def quick_allowed(self, allowed, reason=""):
+        # Enables or greys out the quick look widgets
+        if not allowed:
+            self.quick_on.set(0)
+        for widget in self.quick_widgets:
+            widget.config(state="normal" if allowed else "disabled")
+        self.quick_txt.set(reason)
+
+    def quick_picks(self):
+        """ Reads the quick look fields
+
+        :return: (start, stop, stride, outliers), or None if the fields
+        could not be read; the problem is shown next to them
+        """
+        try:
+            start, stop, stride = slice_text(self.quick_range.get())
+            outliers = int(self.quick_outliers.get() or 0)
+            if outliers < 0:
+                raise ValueError
+        except ValueError:
+            self.quick_txt.set("Shots as start:stop:stride, outliers as a count")
+            return None
+
+        self.quick_txt.set("")
+        return start, stop, stride, outliers
+
+    def compare_setup(self):
+        # Widgets for adding directories to compare and picking how
+        # their boards are shown
+        compare_btn = Button(self.entry_frame, text="Add directory",
+                             command=lambda: self.compare_dir())
+        compare_btn.pack(side="left")
+
+        mode_pick = Combobox(self.entry_frame, values=["Overlay", "Difference"],
+                             textvariable=self.compare_mode,
+                             state="readonly", width=10)
+        mode_pick.bind("<<ComboboxSelected>>",
+                       lambda event: self.board_options.compare_all())
+        mode_pick.pack(side="left")
+
+        compare_label = Label(self.entry_frame, textvariable=self.compare_txt)
+        compare_label.pack(side="right")
+
     def show_options(self):
         """Set in label for the check-box frame"""
         self.board_options.pack(side="left", expand=False)
 
+    def waterfall_setup(self):
+        compact_btn = Checkbutton(self.checkbox_frame, text="Compact",
+                                  variable=self.board_options.compact)
+        compact_btn.pack(side="right", anchor="ne")
+
+        events_btn = Button(self.checkbox_frame, text="Events",
+                            command=lambda: self.show_events())
+        events_btn.pack(side="right", anchor="ne")
+
+        analytics_btn = Button(self.checkbox_frame, text="Analytics",
+                               command=lambda: self.show_analytics())
+        analytics_btn.pack(side="right", anchor="ne")
+
+        envelope_btn = Button(self.checkbox_frame, text="Envelope",
+                              command=lambda: self.show_envelope())
+        envelope_btn.pack(side="right", anchor="ne")
+
+        waterfall_btn = Button(self.checkbox_frame, text="Waterfall",
+                               command=lambda: self.show_waterfall())
+        waterfall_btn.pack(side="right", anchor="ne")
+
+        board_pick = Combobox(self.checkbox_frame, values=self.seq_list,
+                              textvariable=self.waterfall_board,
+                              state="readonly", width=8)
+        board_pick.pack(side="right", anchor="ne")
+
+    def show_waterfall(self):
+        # Nothing to show until a directory has been read
+        if not self.xml.xml_full_path:
+            return
+
+        board_num = self.seq_list.index(self.waterfall_board.get())
+        WaterfallView(self.controller, self.board_options.data_gen(board_num),
+                      self.seq_list[board_num], animator=self.animator)
+
+    def show_events(self):
+        """Opens the event timeline of the boards on display, or of the
+        chosen board when none is shown"""
+        if not self.xml.xml_full_path:
+            return
+
+        waves = dict(self.board_options.board_data)
+        if not waves:
+            board_num = self.seq_list.index(self.waterfall_board.get())
+            waves[board_num] = self.board_options.data_gen(board_num)
+
+        EventTimeline(self.controller, waves, animator=self.animator)
+
+    def show_analytics(self):
+        # Nothing to measure until a directory has been read; the
+        # table reads files from disk, which an archive does not have
+        if not self.xml.xml_full_path or self.xml.archive is not None:
+            return
+
+        AnalyticsTable(self.controller, self.xml.xml_full_path, workers=4)
+
+    def show_envelope(self):
+        """Overlays the envelope of all shots on the chosen board if
+        it is on display, computing the statistics off the GUI thread"""
+        board_num = self.seq_list.index(self.waterfall_board.get())
+        board = self.board_options.check_btn[board_num]
+
+        if board not in self.animator.boards_to_animate:
+            return
+
+        job = self.stats_pool.submit(board_statistics,
+                                     self.animator.boards_to_animate[board])
+        self.after(100, self.envelope_ready, board, job)
+
+    def envelope_ready(self, board, job):
+        if not job.done():
+            self.after(100, self.envelope_ready, board, job)
+            return
+
+        grid, stats = job.result()
+        self.animator.add_envelope(board, grid, stats)
+
     def canvas_setup(self):
         self.canvas_body.pack(side="top", anchor="nw", fill="both", expand=True)
         self.toolbar.pack(side="left", anchor="sw", fill="x")
@@ -293,9 +632,21 @@ class StartPage(Frame):
     def choice_show(self):
         self.choice_display.insert(index=0, string=self.xml_dir.get())
 
-    def file_name(self):
-        # Store full path to chosen directory and display it
-        self.xml_dir.set(get_file(self.window))
+    def file_name(self, archive=False):
+        # A quick look is checked before anything is read, so a typo in
+        # its fields stops here instead of after picking the directory
+        if self.quick_on.get() == 1 and not archive \
+                and self.quick_picks() is None:
+            return
+
+        # Archives are read member by member and always in full
+        if self.client is None:
+            self.quick_allowed(not archive,
+                               "(not with an archive)" if archive else "")
+
+        # Store full path to chosen directory (or archive) and display it
+        self.xml_dir.set(get_archive(self.window) if archive
+                         else get_file(self.window))
         self.choice_show()
 
         # Disable the ability to modify the input, extract information
@@ -304,12 +655,74 @@ class StartPage(Frame):
         self.get_info()
         self.checkbox_frame.after(10, self.update_checkbox())
 
+    def compare_dir(self):
+        """Adds a directory to compare with the chosen one. It loads
+        in the background; boards on display are redrawn once it is in"""
+        directory = get_file(self.window)
+        if not directory:
+            return
+
+        self.acquisitions.add(directory)
+        self.compare_txt.set("Compared: {0} (loading)".format(len(self.acquisitions)))
+        self.after(200, self.compare_ready, directory)
+
+    def compare_ready(self, directory):
+        if not self.acquisitions.ready(directory):
+            self.after(200, self.compare_ready, directory)
+            return
+
+        # Surface a directory that could not be read, whatever the
+        # worker raised (bad XML, missing files, a server error)
+        try:
+            self.acquisitions.board(directory, 0)
+        except Exception as err:
+            self.acquisitions.remove(directory)
+            self.compare_txt.set(str(err) or type(err).__name__)
+            return
+
+        loading = "" if self.acquisitions.ready() else " (loading)"
+        self.compare_txt.set("Compared: {0}{1}".format(len(self.acquisitions),
+                                                       loading))
+        if self.board_options.xml_info:
+            self.board_options.compare_all()
+
     def get_info(self):
+        # Stop filling in the shots of an earlier quick look and the
+        # indexing of an earlier directory
+        if self.quick is not None:
+            self.quick.close()
+            self.quick = None
+        if self.xml.index is not None:
+            self.xml.index.close()
+            self.xml.index = None
+
+        if is_archive(self.xml_dir.get()):
+            # Archives are always read here, member by member
+            self.xml.get_archive_list(self.xml_dir.get())
+            return
+
+        if self.client is not None:
+            # The server lists and parses the directory
+            convention, names = self.client.shot_names(self.xml_dir.get())
+            self.xml.xml_list.append(self.xml_dir.get())
+            self.xml.xml_full_path = [self.xml_dir.get() + '/' + x for x in names]
+            self.xml.stop_condition = len(names)
+            return
+
         self.xml.get_xml_list(self.xml_dir.get())
-        self.get_waveforms(self.xml.xml_full_path, self.xml.stop_condition)
 
-    def get_waveforms(self, xml_paths, shot_count):
-        self.xml.waveforms.append(xml_root(xml_paths, shot_count))
+        if self.quick_on.get() == 1:
+            # Parse the picked shots now and the others in the background
+            start, stop, stride, outliers = self.quick_picks()
+            shots = pick_shots(self.xml.stop_condition, start, stop, stride,
+                               outliers=outliers, paths=self.xml.xml_full_path)
+            self.quick = QuickLook(self.xml.xml_full_path, shots)
+            self.quick.start()
+            return
+
+        # Boards are read through the index as they are toggled on; the
+        # byte ranges of the files are recorded in the background
+        self.xml.index.index_in_background()
 
     def update_checkbox(self):
         """Taking advantage of the order of executions
@@ -317,8 +730,19 @@ class StartPage(Frame):
         objects of respective application components for
         starting and controlling the animation
         """
+        # Archives are read in this process even with a dataset server
+        client = self.client if self.xml.archive is None else None
+
         self.board_options.xml_info["waveforms"] = self.xml.waveforms
+        self.board_options.xml_info["index"] = self.xml.index \
+            if self.quick is None else None
         self.board_options.xml_info["xml_count"] = self.xml.stop_condition
+        self.board_options.xml_info["client"] = client
+        self.board_options.xml_info["directory"] = self.xml_dir.get()
+        self.board_options.xml_info["compare"] = self.acquisitions
+        self.board_options.xml_info["quick"] = self.quick
+        self.board_options.compare_mode = self.compare_mode
+        self.board_options.compare_txt = self.compare_txt
 
         self.board_options.fig = self.plot_fig
         self.board_options.label_txt = self.shot_info
@@ -332,9 +756,20 @@ class StartPage(Frame):
         self.animator.label_txt = self.shot_info
         self.animator.shot_len = self.xml.stop_condition
         self.animator.shot_label = self.show_shot_num
+        self.animator.shot_subset = None if self.quick is None \
+            else self.quick.shots
         self.animator.frame_seq = self.animator.new_frame_seq()
-        self.animator.step_up_dwn = PrevNextIterator(
-            [x for x in self.animator.frame_seq])
+        self.animator.seek_range(self.xml.stop_condition)
+        if self.quick is not None:
+            self.animator.tr_source = self.quick.repetition_times
+        elif client is not None:
+            self.animator.tr_source = lambda: client.repetition_times(
+                self.xml_dir.get())
+        elif self.xml.index is not None:
+            self.animator.tr_source = self.xml.index.repetition_times
+        else:
+            self.animator.tr_source = lambda: ssp_end_time(self.xml.waveforms[0],
+                                                           self.xml.stop_condition)
 
 
 class MainContainer(Tk):
@@ -343,9 +778,13 @@ class MainContainer(Tk):
     widgets for user choice and visualization.
     """
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, server=None, **kwargs):
         Tk.__init__(self, *args, **kwargs)
 
+        # host:port of a dataset server (see dataset_server), or None
+        # to parse the XML files in this process
+        self.server = server
+
         Tk.wm_title(self, "Sequence Viewer")
 
         Tk.wm_resizable(self, width=True, height=True)
@@ -0,0 +1,93 @@
+# Author: Nana K. Owusu
+# This module contains the window that shows every shot of one
+# sequencer board as a single image (shots x time). The shots are
+# resampled onto a common time grid in parallel chunks and the image
+# is filled in as the chunks finish, so drift across an acquisition
+# can be spotted without animating through it.
+
+# Modules for GUI #
+from tkinter import Toplevel
+
+# Modules for interactive plotting in GUI #
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg as FigCanvas
+from matplotlib.backends.backend_tkagg import NavigationToolbar2Tk as NavTb2
+from matplotlib.figure import Figure
+
+# Modules for building the image #
+from concurrent.futures import ThreadPoolExecutor
+from numpy import empty, nan, nanmin, nanmax
+from backend_resample import common_grid, resample_shots
+
+
+class WaterfallView(Toplevel):
+    """ Tkinter based window with a shots x time heatmap of a board.
+    Clicking a row moves the ShotAnimator to that shot.
+    """
+    def __init__(self, parent, wave, name, animator=None, samples=1024,
+                 chunk=256, workers=4):
+        Toplevel.__init__(self, parent)
+
+        Toplevel.wm_title(self, "Waterfall: {0} Board".format(name))
+
+        self.wave = wave
+        self.animator = animator
+        self.shot_count = wave.shape[0]
+        self.grid = common_grid(wave, samples)
+
+        # Rows are NaN (blank) until their chunk is resampled
+        self.image = empty((self.shot_count, samples), dtype='float32')
+        self.image.fill(nan)
+
+        self.fig = Figure(figsize=[10.0, 7.0])
+        ax = self.fig.add_subplot(1, 1, 1)
+        self.img_obj = ax.imshow(self.image, aspect='auto',
+                                 interpolation='nearest', origin='upper',
+                                 extent=[self.grid[0], self.grid[-1],
+                                         self.shot_count - 0.5, -0.5])
+        ax.set_xlabel('Time (us)')
+        ax.set_ylabel('Shot #')
+        ax.set_title('Sequence {0} Board'.format(name))
+        self.fig.colorbar(self.img_obj, ax=ax, label='Amplitude (a.u.)')
+
+        self.mpl_cnv = FigCanvas(self.fig, self)
+        self.toolbar = NavTb2(self.mpl_cnv, self)
+        self.toolbar.pack(side="bottom", anchor="sw", fill="x")
+        self.mpl_cnv.get_tk_widget().pack(side="top", fill="both", expand=True)
+        self.mpl_cnv.mpl_connect('button_press_event', self.row_clicked)
+
+        # Resample chunks of shots in worker threads
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.pending = [self.pool.submit(self.build_rows, start,
+                                         min(start + chunk, self.shot_count))
+                        for start in range(0, self.shot_count, chunk)]
+        self.protocol("WM_DELETE_WINDOW", self.close)
+        self.after(50, self.poll_rows)
+
+    def build_rows(self, start, stop):
+        self.image[start:stop] = resample_shots(self.wave[start:stop], self.grid)
+
+    def poll_rows(self):
+        # Redraw the image with the chunks finished so far
+        done = [job for job in self.pending if job.done()]
+        if done:
+            for job in done:
+                job.result()
+                self.pending.remove(job)
+
+            self.img_obj.set_data(self.image)
+            self.img_obj.set_clim(nanmin(self.image), nanmax(self.image))
+            self.mpl_cnv.draw_idle()
+
+        if self.pending:
+            self.after(50, self.poll_rows)
+
+    def row_clicked(self, event):
+        # Ignore clicks meant for the zoom/pan tools
+        if event.inaxes is None or self.toolbar.mode or self.animator is None:
+            return
+
+        self.animator.seek(int(round(event.ydata)))
+
+    def close(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        self.destroy()
@@ -0,0 +1,52 @@
+# Author: Nana K. Owusu
+# This script times reading an archive of shot files directly (see
+# backend_archive) against extracting it to a temporary directory and
+# reading the files from there.
+#
+# Usage:  python archive_throughput.py shots.tar.gz --workers 4
+
+# Modules for timing #
+from os.path import getsize
+from time import perf_counter
+from argparse import ArgumentParser
+
+# Modules for reading archives #
+from backend_archive import archive_load, extract_then_load
+
+
+def throughput(path, workers=4):
+    """ Input:
+            - path: full path to a tar or zip archive of XML files.
+            - workers: number of threads decompressing zip members.
+        Output:
+            - report: dict of seconds, shots per second and archive
+            megabytes per second for streaming and extract-then-load.
+    """
+    size = getsize(path) / 2**20
+    report = dict()
+
+    for label, load in (('stream', lambda: archive_load(path, workers)),
+                        ('extract', lambda: extract_then_load(path))):
+        start = perf_counter()
+        names, roots = load()
+        seconds = perf_counter() - start
+
+        report[label] = {'seconds': seconds, 'shots': len(names),
+                         'shots_per_s': len(names) / seconds,
+                         'mb_per_s': size / seconds}
+
+    return report
+
+
+if __name__ == '__main__':
+    options = ArgumentParser(description='Time reading an archive of shot '
+                                         'files directly against extracting '
+                                         'it first.')
+    options.add_argument('archive')
+    options.add_argument('--workers', type=int, default=4)
+    args = options.parse_args()
+
+    for label, row in throughput(args.archive, args.workers).items():
+        print('{0:>8}: {1:5d} shots in {2:7.2f} s  {3:8.1f} shots/s  '
+              '{4:7.1f} MB/s'.format(label, row['shots'], row['seconds'],
+                                     row['shots_per_s'], row['mb_per_s']))
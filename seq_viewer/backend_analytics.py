@@ -0,0 +1,126 @@
+# Author: Nana K. Owusu
+# This module contains functions that compute per-shot figures of
+# merit from the waveform breakpoints of the gradient (XGRAD, YGRAD,
+# ZGRAD) and RF (RHO1, RHO2) boards: peak amplitude, peak slew rate,
+# RMS amplitude and mean power. Waveforms are piecewise linear between
+# breakpoints, so every integral is exact and computed for a whole
+# chunk of shots at once. Files are read a chunk at a time so memory
+# does not grow with the length of the acquisition.
+
+# Module for math #
+from numpy import abs as np_abs, arange, diff, empty, sqrt, where, \
+    take_along_axis, concatenate
+
+# Modules for extracting shots #
+from backend_parser import xml_root, extract_wfm
+from backend_exciters import ssp_end_time, scale_time, wave_truncate
+from backend_resample import valid_length, bounded_map
+
+BOARD_NAMES = ('SSP', 'XGRAD', 'YGRAD', 'ZGRAD',
+               'RHO1', 'RHO2', 'THETA1', 'THETA2')
+GRADIENT_BOARDS = (1, 2, 3)
+RF_BOARDS = (4, 5)
+
+# One row per shot and board
+METRIC_DTYPE = [('shot', 'i4'), ('board', 'i4'), ('duration', 'f8'),
+                ('peak', 'f8'), ('max_slew', 'f8'), ('rms', 'f8'),
+                ('power', 'f8')]
+
+
+def wave_metrics(wave, board_num, first_shot=0):
+    """ Input:
+            - wave: waveform of a sequencer for a chunk of shots.
+            - board_num: sequencer number (0-7).
+            - first_shot: shot number of the first row of wave.
+        Output:
+            - metrics: structured array (METRIC_DTYPE) with one row per shot.
+    """
+    shot_count, wave_len = wave.shape[0], wave.shape[2]
+    times, amps = wave[:, 0, :], wave[:, 1, :]
+
+    # Segments past the last valid breakpoint are padding
+    length = valid_length(times)
+    in_shot = arange(wave_len - 1)[None, :] < (length[:, None] - 1)
+
+    d_time = where(in_shot, diff(times, axis=1), 0.0)
+    d_amp = where(in_shot, diff(amps, axis=1), 0.0)
+    a_0, a_1 = amps[:, :-1], amps[:, 1:]
+
+    # Integral of a^2 over each linear segment
+    energy = (d_time * (a_0 ** 2 + a_0 * a_1 + a_1 ** 2) / 3.0).sum(axis=1)
+    duration = take_along_axis(times, length[:, None] - 1, axis=1)[:, 0] \
+        - times[:, 0]
+    span = where(duration > 0, duration, 1.0)
+
+    # Vertical steps (repeated time values) are not counted as slew
+    slew = np_abs(d_amp) / where(d_time > 0, d_time, 1.0)
+    slew = where(d_time > 0, slew, 0.0)
+
+    valid_amps = where(arange(wave_len)[None, :] < length[:, None], amps, 0.0)
+
+    metrics = empty(shot_count, dtype=METRIC_DTYPE)
+    metrics['shot'] = arange(first_shot, first_shot + shot_count)
+    metrics['board'] = board_num
+    metrics['duration'] = duration
+    metrics['peak'] = np_abs(valid_amps).max(axis=1)
+    metrics['max_slew'] = slew.max(axis=1) if wave_len > 1 else 0.0
+    metrics['rms'] = sqrt(energy / span)
+    metrics['power'] = energy / span
+
+    return metrics
+
+
+def chunk_metrics(xml_sets, first_shot, boards):
+    """ Input:
+            - xml_sets: list of XML global addresses for a chunk of shots.
+            - first_shot: shot number of the first file in the chunk.
+            - boards: sequencer numbers to measure.
+        Output:
+            - metrics: structured array (METRIC_DTYPE) for the chunk.
+    """
+    shot_count = len(xml_sets)
+    roots = xml_root(xml_sets, shot_count)
+
+    # The same TR replacement and truncation as board_waveform, so the
+    # figures describe the waveforms on display
+    ssp_endings = ssp_end_time(roots, shot_count)
+
+    found = []
+    for board in boards:
+        wave, idx_to_cut = scale_time(extract_wfm(roots, board, shot_count),
+                                      ssp_endings, shot_count)
+        found.append(wave_metrics(wave_truncate(wave, idx_to_cut, shot_count),
+                                  board, first_shot))
+    del roots
+
+    return concatenate(found)
+
+
+def stream_metrics(xml_sets, boards=GRADIENT_BOARDS + RF_BOARDS, chunk=64,
+                   workers=0):
+    """ Input:
+            - xml_sets: sorted list of XML global addresses.
+            - boards: sequencer numbers to measure.
+            - chunk: number of files read at a time.
+            - workers: number of processes; 0 reads in this process.
+        Output:
+            - generator of structured arrays (METRIC_DTYPE), one per chunk,
+            in shot order.
+    """
+    jobs = ((xml_sets[start:start + chunk], start, boards)
+            for start in range(0, len(xml_sets), chunk))
+
+    yield from bounded_map(chunk_metrics, jobs, workers)
+
+
+def acquisition_metrics(xml_sets, boards=GRADIENT_BOARDS + RF_BOARDS,
+                        chunk=64, workers=0):
+    """ Input:
+            - xml_sets: sorted list of XML global addresses.
+            - boards: sequencer numbers to measure.
+            - chunk: number of files read at a time.
+            - workers: number of processes; 0 reads in this process.
+        Output:
+            - metrics: structured array (METRIC_DTYPE) for every shot.
+    """
+    return concatenate(list(stream_metrics(xml_sets, boards, chunk, workers)))
@@ -0,0 +1,153 @@
+# Author: Nana K. Owusu
+# This module contains the reading of shot files straight out of tar
+# and zip archives, without extracting them to disk. Members are named
+# and ordered with the same conventions as the files of a directory
+# (name_convention/xml_order) and each one is parsed from its
+# decompressed stream. Zip members are compressed one by one, so they
+# are decompressed by a pool of threads (zlib lets go of the GIL while
+# it inflates). A compressed tar is a single stream and is read in one
+# pass in the order it was written.
+#
+# Compare with extracting first:  python archive_throughput.py shots.tar.gz
+
+# Modules for reading archives #
+from tarfile import open as tar_open, is_tarfile
+from zipfile import ZipFile, is_zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+# Modules for parsing members #
+from xml.etree.ElementTree import parse, fromstring, ParseError
+
+# Modules for listing members and extracting to disk #
+from os import walk
+from os.path import isfile, basename
+from tempfile import TemporaryDirectory
+
+# Modules for naming and ordering shots #
+from backend_parser import name_convention, xml_order, xml_listing, xml_root
+
+
+def is_archive(path):
+    """ Input:
+            - path: full path chosen by the user.
+        Output:
+            - True if the path is a tar (of any compression) or zip file.
+    """
+    return isfile(path) and (is_zipfile(path) or is_tarfile(path))
+
+
+def member_list(names):
+    # Member names that can be shots: files that are not hidden,
+    # e.g. not the '._' copies some archivers add
+    return [x for x in names if not x.endswith('/')
+            and not basename(x).startswith('.')]
+
+
+def parses(text):
+    # True if the bytes hold an XML document
+    try:
+        fromstring(text)
+    except ParseError:
+        return False
+
+    return True
+
+
+def zip_load(path, workers=4):
+    """ Input:
+            - path: full path to a zip archive.
+            - workers: number of threads decompressing members.
+        Output:
+            - names: member names in shot order.
+            - roots: ElementTree root of each shot, in shot order.
+    """
+    with ZipFile(path) as archive:
+        members = member_list(archive.namelist())
+        convention, names = name_convention(
+            members, lambda x: parses(archive.read(x)))
+        names = xml_order(convention, names)
+
+        # Members are inflated in parallel a batch at a time and
+        # parsed as they come back, so few are held as bytes at once.
+        roots = []
+        batch = 4 * workers
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for start in range(0, len(names), batch):
+                roots.extend(fromstring(text) for text in
+                             pool.map(archive.read, names[start:start + batch]))
+
+    return names, roots
+
+
+def tar_load(path):
+    """ Input:
+            - path: full path to a tar archive, compressed or not.
+        Output:
+            - names: member names in shot order.
+            - roots: ElementTree root of each shot, in shot order.
+    """
+    # The stream is read once: every member that parses is kept by
+    # name and the shots are picked out once the names are known.
+    parsed = dict()
+    with tar_open(path, mode='r|*') as archive:
+        for member in archive:
+            if not member.isfile() or not member_list([member.name]):
+                continue
+
+            try:
+                parsed[member.name] = parse(archive.extractfile(member)).getroot()
+            except ParseError:
+                continue
+
+    convention, names = name_convention(list(parsed), lambda x: True)
+    names = xml_order(convention, names)
+
+    return names, [parsed[x] for x in names]
+
+
+def archive_load(path, workers=4):
+    """ Input:
+            - path: full path to a tar or zip archive of XML files.
+            - workers: number of threads decompressing zip members.
+        Output:
+            - names: member names in shot order.
+            - roots: ElementTree root of each shot, as from xml_root().
+    """
+    if is_zipfile(path):
+        names, roots = zip_load(path, workers)
+    elif is_tarfile(path):
+        names, roots = tar_load(path)
+    else:
+        raise UserWarning('{0} is not a tar or zip archive.'.format(path))
+
+    if not names:
+        raise UserWarning('Found no XML files in the archive.\n')
+
+    return names, roots
+
+
+def extract_then_load(path):
+    """ Input:
+            - path: full path to a tar or zip archive of XML files.
+        Output:
+            - names, roots: as from archive_load(), by way of extracting
+            the archive to a temporary directory first.
+    """
+    with TemporaryDirectory() as scratch:
+        if is_zipfile(path):
+            with ZipFile(path) as archive:
+                archive.extractall(scratch)
+        else:
+            with tar_open(path) as archive:
+                archive.extractall(scratch, filter='data')
+
+        # Members may sit in a folder inside the archive
+        folder = next((root for root, dirs, files in walk(scratch)
+                       if member_list(files)), None)
+        if folder is None:
+            raise ValueError('Found no XML files in {0}.'.format(path))
+        convention, found = xml_listing(folder)
+        ordered = xml_order(convention, found)
+        roots = xml_root([folder + '/' + x for x in ordered], len(ordered))
+
+    return ordered, roots
@@ -0,0 +1,125 @@
+# Author: Nana K. Owusu
+# This module contains a compact store for the waveform arrays built
+# by extract_wfm, scale_time and wave_truncate. Plotter times fall on
+# a fixed sequencer tick grid, so they are kept as int32 tick counts
+# with the tick size as a ratio of integers. Amplitudes are kept as
+# int16 steps when they sit on a step grid and as float32 otherwise.
+# Shots are turned back into float64 only when they are indexed, i.e.
+# at draw time.
+
+# Module for math #
+from numpy import abs as np_abs, around, empty, float32, float64, gcd, \
+    int16, int32, int64, iinfo, all as np_all
+
+# Decimal places tried when looking for the grid of a set of values
+MAX_DECIMALS = 6
+
+
+def value_grid(values, limit):
+    """ Input:
+            - values: array of float64 values read from the XML text.
+            - limit: largest step count allowed (e.g. int32 or int16 max).
+        Output:
+            - steps: int64 array of step counts, or None if no grid fits.
+            - num, den: integers such that values == steps * num / den
+            exactly in float64.
+    """
+    for decimals in range(MAX_DECIMALS + 1):
+        den = 10 ** decimals
+        scaled = around(values * den)
+
+        # Every value must be a whole number of 10**-decimals
+        if not np_all(scaled / den == values) or np_abs(scaled).max() >= 2**53:
+            continue
+
+        scaled = scaled.astype(int64)
+        num = int(gcd.reduce(scaled.ravel())) or 1
+        steps = scaled // num
+
+        if np_abs(steps).max() <= limit:
+            return steps, num, den
+
+        return None, 1, 1
+
+    return None, 1, 1
+
+
+class CompactWave:
+    """ Waveform of a sequencer for all shots held as integer ticks
+    and low-precision amplitudes. Indexing it like the float64 array
+    from board_waveform (wave[t, 0, :]) returns float64 values.
+    """
+    def __init__(self, ticks, tick_num, tick_den, amps, amp_num=1, amp_den=1):
+        self.ticks = ticks
+        self.tick_num = tick_num
+        self.tick_den = tick_den
+
+        # amps is int16 steps of amp_num / amp_den, or float32
+        self.amps = amps
+        self.amp_num = amp_num
+        self.amp_den = amp_den
+
+        self.shape = (ticks.shape[0], 2, ticks.shape[1])
+        self.ndim = 3
+
+    @classmethod
+    def from_wave(cls, wave):
+        """ Input:
+                - wave: float64 waveform of a sequencer for all shots.
+            Output:
+                - compact: CompactWave of the same waveform, or the input
+                array if its times do not sit on a tick grid.
+        """
+        ticks, tick_num, tick_den = value_grid(wave[:, 0, :], iinfo(int32).max)
+        if ticks is None:
+            return wave
+
+        steps, amp_num, amp_den = value_grid(wave[:, 1, :], iinfo(int16).max)
+        if steps is None:
+            amps, amp_num, amp_den = wave[:, 1, :].astype(float32), 1, 1
+        else:
+            amps = steps.astype(int16)
+
+        return cls(ticks.astype(int32), tick_num, tick_den, amps,
+                   amp_num, amp_den)
+
+    def __len__(self):
+        return self.shape[0]
+
+    @property
+    def nbytes(self):
+        return self.ticks.nbytes + self.amps.nbytes
+
+    @property
+    def dtype(self):
+        return float64
+
+    def decode(self, shots):
+        # float64 [time, amplitude] of the chosen shots
+        ticks = self.ticks[shots]
+        wave = empty(ticks.shape[:-1] + (2, ticks.shape[-1]))
+
+        wave[..., 0, :] = ticks.astype(int64) * self.tick_num / self.tick_den
+        if self.amps.dtype == int16:
+            wave[..., 1, :] = self.amps[shots].astype(int64) * self.amp_num \
+                / self.amp_den
+        else:
+            wave[..., 1, :] = self.amps[shots]
+
+        return wave
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            return self.decode(key)
+
+        # Only the chosen shots are decoded; the rest of the key then
+        # applies to the [time, amplitude] and sample axes.
+        wave = self.decode(key[0])
+        if wave.ndim == 2:
+            return wave[key[1:]]
+
+        return wave[(slice(None),) + key[1:]]
+
+    def __array__(self, dtype=None, copy=None):
+        wave = self.decode(slice(None))
+        return wave if dtype is None else wave.astype(dtype)
@@ -0,0 +1,181 @@
+# Author: Nana K. Owusu
+# This module contains the splitting of board waveforms into discrete
+# events: an RF pulse on RHO1, a gradient lobe on ZGRAD. An event is a
+# run of linear segments between breakpoints where the amplitude is
+# away from zero; a breakpoint at zero inside a run (e.g. between the
+# two lobes of a bipolar gradient) ends one event and starts the next.
+# Each event is one row of a structured array with its start and end
+# time, signed peak amplitude and area. All shots of a batch are
+# segmented at once by flattening them into one row.
+
+# Module for math #
+from numpy import abs as np_abs, arange, concatenate, cumsum, diff, empty, \
+    where, zeros, maximum, minimum, ones, inf
+
+# Module for ending a shot at its last breakpoint #
+from backend_resample import valid_length
+
+# One row per event
+EVENT_DTYPE = [('shot', 'i4'), ('board', 'i4'), ('start', 'f8'),
+               ('end', 'f8'), ('peak', 'f8'), ('area', 'f8')]
+
+# Fields that can be searched; duration (end - start) and magnitude
+# (size of the peak) are worked out from the stored fields
+SEARCH_FIELDS = ('shot', 'board', 'start', 'end', 'peak', 'area',
+                 'duration', 'magnitude')
+
+
+def wave_events(wave, board_num, first_shot=0, threshold=0.0):
+    """ Input:
+            - wave: waveform of a sequencer for a batch of shots.
+            - board_num: sequencer number (0-7).
+            - first_shot: shot number of the first row of wave.
+            - threshold: amplitudes at or below this size count as zero.
+        Output:
+            - events: structured array (EVENT_DTYPE), in shot and time order.
+    """
+    shot_count, wave_len = wave.shape[0], wave.shape[2]
+    if shot_count == 0 or wave_len < 2:
+        return empty(0, dtype=EVENT_DTYPE)
+
+    times, amps = wave[:, 0, :], wave[:, 1, :]
+
+    # Segments past the last valid breakpoint are padding
+    length = valid_length(times)
+    in_shot = arange(wave_len - 1)[None, :] < (length[:, None] - 1)
+
+    active = np_abs(amps) > threshold
+    seg_on = in_shot & (active[:, :-1] | active[:, 1:])
+
+    # A segment carries on the event of the one before it when both
+    # are on and the breakpoint they share is away from zero
+    prev_on = zeros(seg_on.shape, dtype=bool)
+    prev_on[:, 1:] = seg_on[:, :-1]
+    next_on = zeros(seg_on.shape, dtype=bool)
+    next_on[:, :-1] = seg_on[:, 1:]
+
+    first = (seg_on & ~(prev_on & active[:, :-1])).ravel().nonzero()[0]
+    last = (seg_on & ~(next_on & active[:, 1:])).ravel().nonzero()[0]
+
+    # Flat segment index -> shot row and the flat breakpoints around it
+    segs = wave_len - 1
+    row = first // segs
+    p_first = row * wave_len + first % segs
+    p_last = row * wave_len + last % segs + 1
+
+    flat_times = times.ravel()
+
+    # Area of the trapezoid under each segment, summed over each event
+    seg_area = where(seg_on, diff(times, axis=1) * (amps[:, :-1] + amps[:, 1:])
+                     / 2.0, 0.0).ravel()
+    area_sum = cumsum(seg_area)
+
+    # Peak over the breakpoints of each event: reduceat over
+    # [first, last] pairs, keeping every other result
+    bounds = empty(2 * first.size, dtype=first.dtype)
+    bounds[0::2] = p_first
+    bounds[1::2] = p_last + 1
+    flat_amps = concatenate([amps.ravel(), [0.0]])
+    high = maximum.reduceat(flat_amps, bounds)[0::2]
+    low = minimum.reduceat(flat_amps, bounds)[0::2]
+
+    events = empty(first.size, dtype=EVENT_DTYPE)
+    events['shot'] = first_shot + row
+    events['board'] = board_num
+    events['start'] = flat_times[p_first]
+    events['end'] = flat_times[p_last]
+    events['peak'] = where(high >= -low, high, low)
+    events['area'] = area_sum[last] - area_sum[first] + seg_area[first]
+
+    return events
+
+
+def board_events(wave, board_num, batch=512, threshold=0.0):
+    """ Input:
+            - wave: waveform of a sequencer for all shots.
+            - board_num: sequencer number (0-7).
+            - batch: number of shots segmented at a time.
+            - threshold: amplitudes at or below this size count as zero.
+        Output:
+            - events: structured array (EVENT_DTYPE) for every shot.
+    """
+    found = [wave_events(wave[start:start + batch], board_num, start, threshold)
+             for start in range(0, wave.shape[0], batch)]
+
+    return concatenate(found) if found else empty(0, dtype=EVENT_DTYPE)
+
+
+def search_events(events, **ranges):
+    """ Input:
+            - events: structured array (EVENT_DTYPE).
+            - ranges: field=value for an exact match, or field=(low, high)
+            for an inclusive range where either end may be None. Fields
+            are those of SEARCH_FIELDS; e.g. board=4, peak=(0.5, None).
+        Output:
+            - found: boolean array marking the events that match.
+    """
+    found = ones(events.size, dtype=bool)
+
+    for field, wanted in ranges.items():
+        if field not in SEARCH_FIELDS:
+            raise UserWarning('Events cannot be searched by {0}.'.format(field))
+
+        if field == 'duration':
+            values = events['end'] - events['start']
+        elif field == 'magnitude':
+            values = np_abs(events['peak'])
+        else:
+            values = events[field]
+
+        if isinstance(wanted, tuple):
+            low, high = wanted
+            found &= values >= (-inf if low is None else low)
+            found &= values <= (inf if high is None else high)
+        else:
+            found &= values == wanted
+
+    return found
+
+
+def parse_query(text, board_names=()):
+    """ Input:
+            - text: conditions separated by spaces, each a field, one of
+            = < > <= >= and a number, e.g. 'board=RHO1 magnitude>0.5
+            duration<=200'. Board names may stand for board numbers.
+            - board_names: names of the boards in board order.
+        Output:
+            - ranges: keyword arguments for search_events().
+    """
+    ranges = dict()
+
+    for condition in text.split():
+        for op in ('<=', '>=', '=', '<', '>'):
+            if op in condition:
+                field, value = condition.split(op, 1)
+                break
+        else:
+            raise UserWarning('Could not read the condition {0}.'.format(condition))
+
+        field = field.strip().lower()
+        value = value.strip()
+        if value.upper() in board_names:
+            value = board_names.index(value.upper())
+
+        try:
+            value = float(value)
+        except ValueError:
+            raise UserWarning('{0} is not a number.'.format(value))
+
+        # Strict bounds are treated as inclusive; amplitudes and times
+        # are not compared to exact values in practice
+        low, high = ranges.get(field, (None, None))
+        if op == '=':
+            low, high = value, value
+        elif op in ('>', '>='):
+            low = value
+        else:
+            high = value
+
+        ranges[field] = (low, high)
+
+    return ranges
@@ -31,6 +31,17 @@ def ssp_end_time(wave_objects, shot_count):
     # Waveform of the SSP board
     ssp_wave = extract_wfm(wave_objects, 0, shot_count)
 
+    return ssp_wave_end_time(ssp_wave, shot_count)
+
+
+def ssp_wave_end_time(ssp_wave, shot_count):
+    """ Input:
+            - ssp_wave: waveform of the SSP board, as from extract_wfm.
+            - shot_count: count of shots in ssp_wave.
+        Output:
+            - last_time: list of first time points > the stop time for each time point.
+    """
+
     # Empty list for true final time points
     last_time = []
 
@@ -0,0 +1,308 @@
+# Author: Nana K. Owusu
+# This module contains the byte-offset index of a directory of XML
+# files. A sidecar manifest stores the shot order worked out by
+# xml_itemize/xml_sort and, for each file that has been looked at,
+# the byte range of every sequencer's waveform text. Reading a single
+# shot of a single board then means memory-mapping the file and
+# parsing only that slice. A whole board is read the same way, one
+# slice per file, instead of parsing every file into an ElementTree.
+
+# Modules for the manifest #
+from json import load, dump
+from os import stat, replace, listdir, fdopen, remove
+from os.path import join
+from tempfile import mkstemp
+
+# Modules for reading slices of a file #
+from mmap import mmap, ACCESS_READ
+from xml.parsers.expat import ParserCreate
+from threading import RLock, Thread
+
+# Module for math #
+from numpy import array, zeros
+
+# Modules for listing the directory #
+from backend_parser import xml_listing, xml_order
+
+# Modules for the TR and truncation of a board #
+from backend_exciters import ssp_wave_end_time, scale_time, wave_truncate
+
+MANIFEST_NAME = '.seq_viewer_index.json'
+MANIFEST_VERSION = 1
+
+# Newly indexed files kept in memory before the manifest is rewritten
+SAVE_EVERY = 64
+
+
+def dir_entries(directory):
+    # Directory listing used to tell whether files were added or removed
+    return sorted(x for x in listdir(directory) if not x.startswith(MANIFEST_NAME))
+
+
+def waveform_ranges(path):
+    """ Input:
+            - path: full path to an XML file.
+        Output:
+            - ranges: list of [start, stop] byte offsets of the waveform
+            text of each sequencer, in sequencer order.
+    """
+    ranges = []
+    depth = [0]
+    parser = ParserCreate()
+
+    def start_element(name, attrs):
+        depth[0] += 1
+
+        # The waveform text is the first child of each sequencer,
+        # which sits under the root element.
+        if depth[0] == 2:
+            ranges.append(None)
+        elif depth[0] == 3 and ranges and ranges[-1] is None:
+            ranges[-1] = [parser.CurrentByteIndex, None]
+
+    def end_element(name):
+        if depth[0] == 3 and ranges and ranges[-1] is not None \
+                and ranges[-1][1] is None:
+            ranges[-1][1] = parser.CurrentByteIndex
+        depth[0] -= 1
+
+    parser.StartElementHandler = start_element
+    parser.EndElementHandler = end_element
+
+    with open(path, 'rb') as xml_file:
+        parser.ParseFile(xml_file)
+
+    return [x if x is not None else [0, 0] for x in ranges]
+
+
+def slice_wfm(text):
+    """ Input:
+            - text: bytes of a waveform element, start tag included.
+        Output:
+            - wave: Numpy array with abscissa and range of the sequencer.
+    """
+    # Skip the start tag and, as in extract_wfm, the first line
+    body = text[text.find(b'>') + 1:]
+    body = body[body.find(b'\n') + 1:] if b'\n' in body else b''
+
+    return array(body.split(), dtype=float).reshape(-1, 2).T
+
+
+def stack_shots(waves):
+    """ Input:
+            - waves: list of [time, amplitude] arrays, one per shot.
+        Output:
+            - wave_store: array of all shots zero padded to the longest
+            one, as from extract_wfm.
+    """
+    wave_store = zeros((len(waves), 2, max((x.shape[1] for x in waves),
+                                           default=0)))
+    for t, wave in enumerate(waves):
+        wave_store[t, :, :wave.shape[1]] = wave
+
+    return wave_store
+
+
+class ShotIndex:
+    """ Byte-offset index of the XML files of one directory, saved
+    next to the files so it is only built once.
+    """
+    def __init__(self, directory, convention, names):
+        self.directory = directory.rstrip('/')
+        self.convention = convention
+        self.names = names
+
+        # Per file: [size, mtime, ranges]; ranges is None until the
+        # file is first read.
+        self.files = [None for x in names]
+        self.listing = dir_entries(self.directory)
+        self.unsaved = 0
+        self.changed = False
+
+        # TRs from the SSP board, read once; the lock lets a background
+        # thread index files while others read them
+        self.ssp_endings = None
+        self.lock = RLock()
+        self.closed = False
+
+    @classmethod
+    def build(cls, directory):
+        """ Lists and orders the XML files without reading them
+
+        :param directory: Full-path to the directory of XML files
+        :return: ShotIndex of the directory
+        """
+        convention, names = xml_listing(directory)
+        index = cls(directory, convention, xml_order(convention, names))
+        index.changed = True
+
+        return index
+
+    @classmethod
+    def load(cls, directory):
+        """ Reads the saved manifest of a directory
+
+        :param directory: Full-path to the directory of XML files
+        :return: ShotIndex, or None if there is none or files were
+        added or removed since it was saved
+        """
+        directory = directory.rstrip('/')
+        try:
+            with open(join(directory, MANIFEST_NAME)) as manifest:
+                saved = load(manifest)
+        except (OSError, ValueError):
+            return None
+
+        index = cls(directory, saved['convention'], saved['names'])
+        if saved.get('version') != MANIFEST_VERSION or \
+                saved.get('listing') != index.listing:
+            return None
+
+        index.files = saved['files']
+
+        return index
+
+    @classmethod
+    def open(cls, directory):
+        # Saved manifest if it is current, otherwise a new one
+        index = cls.load(directory)
+        if index is None:
+            index = cls.build(directory)
+            index.save()
+
+        return index
+
+    def save(self):
+        """ Writes the manifest; a read-only directory is left as is """
+        with self.lock:
+            self._save()
+
+    def _save(self):
+        if not self.changed:
+            return
+
+        manifest_path = join(self.directory, MANIFEST_NAME)
+        saved = {'version': MANIFEST_VERSION, 'convention': self.convention,
+                 'names': self.names, 'listing': self.listing,
+                 'files': self.files}
+        # A temporary file of its own, so that two writers (threads or
+        # processes) never interleave; the last rename wins whole
+        try:
+            handle, temp_path = mkstemp(prefix=MANIFEST_NAME, dir=self.directory)
+        except OSError:
+            return
+        try:
+            with fdopen(handle, 'w') as manifest:
+                dump(saved, manifest)
+            replace(temp_path, manifest_path)
+        except OSError:
+            try:
+                remove(temp_path)
+            except OSError:
+                pass
+            return
+
+        self.changed = False
+        self.unsaved = 0
+
+    def __len__(self):
+        return len(self.names)
+
+    def paths(self):
+        return [self.directory + '/' + x for x in self.names]
+
+    def ranges(self, shot):
+        """ Byte ranges of the sequencers of a shot, indexing the file
+        the first time it is read or if it changed since.
+
+        :param shot: Integer of the shot
+        :return: List of [start, stop] byte offsets per sequencer
+        """
+        path = self.directory + '/' + self.names[shot]
+        info = stat(path)
+
+        with self.lock:
+            entry = self.files[shot]
+            if entry is None or entry[0] != info.st_size or \
+                    entry[1] != info.st_mtime:
+                entry = [info.st_size, info.st_mtime, waveform_ranges(path)]
+                self.files[shot] = entry
+                self.changed = True
+                self.unsaved += 1
+
+                if self.unsaved >= SAVE_EVERY:
+                    self._save()
+
+            return entry[2]
+
+    def index_files(self, shots=None):
+        """ Records the byte ranges of many files ahead of time, e.g.
+        from a background thread, and saves the manifest.
+
+        :param shots: Iterable of shots to index; all of them if None
+        """
+        for shot in range(len(self)) if shots is None else shots:
+            if self.closed:
+                break
+            self.ranges(shot)
+
+        self.save()
+
+    def shot_wave(self, shot, board):
+        """ Reads one board of one shot from its slice of the file
+
+        :param shot: Integer of the shot
+        :param board: Integer representing sequencer board number (0-7)
+        :return: Array of [time, amplitude] breakpoints of the board
+        """
+        return self.shot_boards(shot, (board,))[0]
+
+    def shot_boards(self, shot, boards):
+        """ Reads some boards of one shot, opening the file once
+
+        :param shot: Integer of the shot
+        :param boards: Sequence of board numbers (0-7)
+        :return: List of [time, amplitude] arrays, one per board
+        """
+        ranges = self.ranges(shot)
+
+        with open(self.directory + '/' + self.names[shot], 'rb') as xml_file:
+            with mmap(xml_file.fileno(), 0, access=ACCESS_READ) as mapped:
+                texts = [mapped[slice(*ranges[x])] for x in boards]
+
+        return [slice_wfm(x) for x in texts]
+
+    def repetition_times(self):
+        """ TR of each shot, as ssp_end_time finds them, from the SSP
+        board's slice of each file; read once """
+        if self.ssp_endings is None:
+            ssp_store = stack_shots([self.shot_wave(t, 0)
+                                     for t in range(len(self))])
+            self.ssp_endings = ssp_wave_end_time(ssp_store, len(self))
+
+        return self.ssp_endings
+
+    def board_waveform(self, board_num):
+        """ Same array as PlotAnimator.board_waveform, read from the
+        board's slice of each file instead of whole parsed files
+
+        :param board_num: Integer representing sequencer board number (0-7)
+        :return: Array of exciter/sequencer information for all shots
+        """
+        ssp_endings = self.repetition_times()
+        wave_store = stack_shots([self.shot_wave(t, board_num)
+                                  for t in range(len(self))])
+
+        wave, idx_to_cut = scale_time(wave_store, ssp_endings, len(self))
+
+        return wave_truncate(wave, idx_to_cut, len(self))
+
+    def index_in_background(self):
+        """ Records the byte ranges of every file from a daemon thread,
+        so that boards read later find them ready. close() stops it.
+        """
+        self.closed = False
+        Thread(target=self.index_files, daemon=True).start()
+
+    def close(self):
+        self.closed = True
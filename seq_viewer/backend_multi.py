@@ -0,0 +1,225 @@
+# Author: Nana K. Owusu
+# This module contains the loading of several acquisition directories
+# for comparison. Each directory is listed, parsed and split into
+# boards in a worker process of a pool shared by every directory, so
+# directories added one after another load side by side. The boards
+# are kept once extracted. Acquisitions are lined up by shot index:
+# shot t of one directory is compared with shot t of the others.
+
+# Modules for loading directories concurrently #
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import get_context
+from threading import Lock
+
+# Module for math #
+from numpy import empty, full, linspace, nan, isnan
+
+# Modules for reading shot directories #
+from backend_index import ShotIndex
+from backend_parser import xml_root
+from backend_resample import common_grid, resample_shots
+from PlotAnimator import board_waveform
+
+ALL_BOARDS = tuple(range(8))
+
+
+def acquisition_boards(directory, boards):
+    """ Input:
+            - directory: full path to a directory of XML files.
+            - boards: board numbers (0-7) to extract.
+        Output:
+            - waves: dict of board number to the waveform array of all
+            shots, as from board_waveform().
+    """
+    index = ShotIndex.open(directory)
+    roots = xml_root(index.paths(), len(index))
+
+    return {board: board_waveform(roots, board, len(index)) for board in boards}
+
+
+def client_boards(client, directory, boards):
+    # Same as acquisition_boards() with the parsing done by a dataset server
+    return {board: client.board_waveform(directory, board) for board in boards}
+
+
+def align_shots(wave, shot_count):
+    """ Input:
+            - wave: waveform of a sequencer for all shots of one acquisition.
+            - shot_count: number of shots of the acquisition it is compared to.
+        Output:
+            - aligned: the first shot_count shots; shots the acquisition
+            does not have are filled with NaN.
+    """
+    if len(wave) >= shot_count:
+        return wave[:shot_count]
+
+    aligned = full((shot_count,) + wave.shape[1:], nan)
+    aligned[:len(wave)] = wave[:]
+
+    return aligned
+
+
+def wave_difference(wave, other, samples=1024, batch=256):
+    """ Input:
+            - wave, other: waveforms of the same sequencer from two
+            acquisitions, lined up by shot.
+            - samples: number of points in the time grid.
+            - batch: number of shots resampled at a time.
+        Output:
+            - difference: array shaped like a waveform, (shots, 2, samples),
+            with the grid times and wave - other at each time. Shots
+            missing from other are NaN.
+    """
+    shot_count = len(wave)
+
+    # Only shots both acquisitions have; NaN rows padded on by
+    # align_shots() would otherwise spread to the grid of every shot
+    present = ~(isnan(wave[:len(other)]).any(axis=(1, 2))
+                | isnan(other[:shot_count]).any(axis=(1, 2)))
+    common = int(present.cumprod().sum())
+
+    # One grid spanning both acquisitions so shot t of each can be
+    # subtracted sample by sample
+    ends = [common_grid(x[:common], 2) for x in (wave, other) if common]
+    grid = linspace(min(x[0] for x in ends), max(x[-1] for x in ends),
+                    samples) if ends else linspace(0.0, 1.0, samples)
+
+    difference = empty((shot_count, 2, samples))
+    difference[:, 0, :] = grid
+    difference[:, 1, :] = nan
+
+    for start in range(0, common, batch):
+        stop = min(start + batch, common)
+        difference[start:stop, 1, :] = resample_shots(wave[start:stop], grid) \
+            - resample_shots(other[start:stop], grid)
+
+    return difference
+
+
+def wave_differences(wave, others):
+    # wave_difference() of a board against each compared acquisition
+    return [wave_difference(wave, x) for x in others]
+
+
+class AcquisitionSet:
+    """ Directories opened for comparison and the boards read from
+    them. Every directory is loaded by the same pool of workers and
+    each board of a directory is extracted only once.
+    """
+    def __init__(self, workers=4, client=None):
+        self.client = client
+        self.directories = []
+
+        # The server does the parsing, so threads are enough to wait on
+        # it. Workers are spawned, not forked: the GUI process has Tk
+        # and pool threads running that a forked child would inherit
+        # mid-operation.
+        if client is None:
+            self.pool = ProcessPoolExecutor(max_workers=workers,
+                                            mp_context=get_context('spawn'))
+        else:
+            self.pool = ThreadPoolExecutor(max_workers=workers)
+
+        # Differences are taken here so the GUI thread only polls them
+        self.threads = ThreadPoolExecutor(max_workers=1)
+
+        # (directory, board) -> Future of {board: wave}
+        self.jobs = dict()
+        self.lock = Lock()
+
+    def __len__(self):
+        return len(self.directories)
+
+    def add(self, directory, boards=ALL_BOARDS):
+        """ Starts loading a directory; returns at once
+
+        :param directory: Full-path to a directory of XML files
+        :param boards: Board numbers to extract; every board by default
+        so toggling boards later does not parse the files again
+        """
+        directory = directory.rstrip('/')
+
+        with self.lock:
+            if directory not in self.directories:
+                self.directories.append(directory)
+
+            missing = [x for x in boards if (directory, x) not in self.jobs]
+            if not missing:
+                return
+
+            if self.client is None:
+                job = self.pool.submit(acquisition_boards, directory, missing)
+            else:
+                job = self.pool.submit(client_boards, self.client, directory,
+                                       missing)
+
+            for board in missing:
+                self.jobs[(directory, board)] = job
+
+    def remove(self, directory):
+        directory = directory.rstrip('/')
+
+        with self.lock:
+            if directory in self.directories:
+                self.directories.remove(directory)
+            for key in [x for x in self.jobs if x[0] == directory]:
+                self.jobs.pop(key)
+
+    def ready(self, directory=None):
+        """ True once the directory (or every directory) is loaded """
+        with self.lock:
+            jobs = [job for key, job in self.jobs.items()
+                    if directory is None or key[0] == directory.rstrip('/')]
+
+        return all(job.done() for job in jobs)
+
+    def board(self, directory, board_num):
+        """ Waveform of a board of one directory, waiting for it if it
+        is still loading.
+
+        :param directory: Full-path to a directory of XML files
+        :param board_num: Integer representing sequencer board number (0-7)
+        :return: Array of exciter/sequencer information for all shots
+        """
+        self.add(directory, (board_num,))
+
+        with self.lock:
+            job = self.jobs[(directory.rstrip('/'), board_num)]
+
+        return job.result()[board_num]
+
+    def boards(self, board_num, loaded_only=False):
+        """ Waveforms of a board of every directory, in the order the
+        directories were added
+
+        :param board_num: Integer representing sequencer board number (0-7)
+        :param loaded_only: Skip directories that are still loading
+        :return: waves: List of waveform arrays
+                 errors: List of (directory, exception) for the
+                 directories that failed to load, left out of waves
+        """
+        waves, errors = [], []
+        for directory in list(self.directories):
+            if loaded_only and not self.ready(directory):
+                continue
+            try:
+                waves.append(self.board(directory, board_num))
+            except Exception as err:
+                errors.append((directory, err))
+
+        return waves, errors
+
+    def difference(self, wave, others):
+        """ Starts subtracting each compared waveform from a board
+        in a worker thread; returns at once
+
+        :param wave: Waveform of the board on display
+        :param others: Waveforms of the compared directories, lined up
+        with wave by align_shots()
+        :return: Future of the list of differences
+        """
+        return self.threads.submit(wave_differences, wave, others)
+
+    def close(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        self.threads.shutdown(wait=False, cancel_futures=True)
@@ -7,6 +7,10 @@
 from re import search
 from numpy import zeros
 
+# Modules for listing and filtering file names #
+from os import listdir
+from fnmatch import filter
+
 # Module for reading XML files #
 from xml.etree.ElementTree import parse
 
@@ -46,6 +50,56 @@ def xml_itemize(convention, text):
         )
 
 
+def xml_listing(file_loc):
+    """ Function for finding the XML files of a directory
+        Input:
+            - file_loc: full path to the directory.
+        Output:
+            - convention: integer for the naming convention of the files.
+            - names: list of the XML file names (unsorted).
+    """
+    file_loc = file_loc.rstrip('/') + '/'
+
+    # Hidden files (e.g. the index manifest) are never shots
+    dir_list = [x for x in listdir(file_loc) if not x.startswith('.')]
+
+    return name_convention(dir_list, lambda x: parse(file_loc + x))
+
+
+def name_convention(dir_list, is_xml):
+    """ Function for telling the naming convention of a list of files
+        Input:
+            - dir_list: list of file names, hidden files left out.
+            - is_xml: function of a file name that is true if the file
+            parses as XML; used when no name contains '.xml'.
+        Output:
+            - convention: integer for the naming convention of the files.
+            - names: list of the XML file names (unsorted).
+    """
+    # store only XML files
+    if len(filter(dir_list, '*.xml*')) > 1:
+        return 0, filter(dir_list, '*.xml.*[^0-9]')
+    elif len(filter(dir_list, '*.xml*')) == 1:
+        return 1, filter(dir_list, '*.xml*')
+    elif len(filter(dir_list, '*')) > 0:
+        return 2, [x for x in filter(dir_list, '*') if is_xml(x)]
+    else:
+        raise UserWarning('Found no XML files or the directory was empty.\n')
+
+
+def xml_order(convention, names):
+    """ Function for putting XML file names in shot order
+        Input:
+            - convention: integer for the naming convention of the files.
+            - names: list of the XML file names as they were read.
+        Output:
+            - ordered: list of the file names in shot order.
+    """
+    order = [xml_itemize(convention, x) for x in names]
+
+    return [name for count, name in xml_sort(order, names)]
+
+
 def function(sorted_list):
     return sorted_list[0]
 
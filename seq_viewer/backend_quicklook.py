@@ -0,0 +1,289 @@
+# Author: Nana K. Owusu
+# This module contains quick-look loading of large acquisitions. Only
+# a chosen set of shots (a range with a stride, the first and last
+# shots and the shots whose files stand out by size) is parsed up
+# front. Boards are held in LazyWave arrays indexed by the true shot
+# number: a skipped shot is parsed the first time it is indexed, and a
+# background thread parses the rest in batches for the boards that
+# are on display. Only the picked shots are kept parsed; the others
+# are dropped once their boards and TR have been taken from them.
+
+# Modules for filling in shots #
+from threading import Thread, RLock
+
+# Module for finding outlying shots #
+from os.path import getsize
+
+# Module for math #
+from numpy import arange, argsort, asarray, concatenate, median, unique, \
+    zeros, full, isnan, nan, abs as np_abs, int64
+
+# Modules for extracting waveforms #
+from backend_parser import xml_root, extract_wfm
+from backend_exciters import ssp_end_time, scale_time, wave_truncate
+
+
+def pick_shots(shot_count, start=0, stop=None, stride=1, ends=1,
+               outliers=0, paths=None):
+    """ Input:
+            - shot_count: file count representing the shots acquired.
+            - start, stop, stride: range of shots to take, as in a slice.
+            - ends: count of shots always taken at the start and the end.
+            - outliers: count of extra shots whose file size is furthest
+            from the typical size (needs paths).
+            - paths: list of XML global addresses in shot order.
+        Output:
+            - shots: sorted array of the shot numbers to load first.
+    """
+    picks = [arange(shot_count)[start:stop:max(int(stride), 1)],
+             arange(min(ends, shot_count)),
+             arange(max(shot_count - ends, 0), shot_count)]
+
+    if outliers and paths:
+        # A shot with a different waveform (e.g. a dummy scan or a
+        # changed prescan) usually writes a file of a different size
+        sizes = asarray([getsize(x) for x in paths], dtype=float)
+        spread = np_abs(sizes - median(sizes))
+        order = argsort(-spread, kind='stable')
+        picks.append(order[spread[order] > 0][:outliers])
+
+    return unique(concatenate(picks).astype(int64))
+
+
+def shot_tr(root):
+    """ Input:
+            - root: ElementTree root of one shot.
+        Output:
+            - tr: the TR ssp_end_time finds on the shot's SSP board, or
+            its last time point if it finds none.
+    """
+    found = ssp_end_time([root], 1)
+    if found:
+        return found[0]
+
+    return extract_wfm([root], 0, 1)[0][0][-1]
+
+
+class LazyWave:
+    """ Waveform of a sequencer for all shots of a QuickLook. Indexing
+    it like the array from board_waveform (wave[t, 0, :]) parses any
+    of the asked-for shots that have not been read yet.
+    """
+    def __init__(self, quick, board_num):
+        self.quick = quick
+        self.board_num = board_num
+
+        self.data = zeros((quick.shot_count, 2, 0))
+        self.loaded = zeros(quick.shot_count, dtype=bool)
+        self.ndim = 3
+
+        self.fill(quick.shots)
+
+    def __len__(self):
+        return self.data.shape[0]
+
+    @property
+    def shape(self):
+        return self.data.shape
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes
+
+    @property
+    def dtype(self):
+        return self.data.dtype
+
+    @property
+    def complete(self):
+        return bool(self.loaded.all())
+
+    def fill(self, shots, parsed=None):
+        """ Reads the board for shots that are not loaded yet
+
+        :param shots: Iterable of shot numbers
+        :param parsed: Dict of shot number to ElementTree root for
+        shots already parsed by the caller
+        """
+        shots = [int(x) for x in shots if not self.loaded[x]]
+        if not shots:
+            return
+
+        wave = self.quick.extract(shots, self.board_num, parsed)
+
+        with self.quick.lock:
+            # Another thread may have filled some of them meanwhile
+            fresh = [idx for idx, x in enumerate(shots) if not self.loaded[x]]
+            if not fresh:
+                return
+            shots = [shots[x] for x in fresh]
+
+            # Shots are zero padded to the longest one, as extract_wfm does
+            width = wave.shape[2]
+            if width > self.data.shape[2]:
+                grown = zeros(self.data.shape[:2] + (width,))
+                grown[:, :, :self.data.shape[2]] = self.data
+                self.data = grown
+
+            self.data[shots, :, :width] = wave[fresh]
+            self.data[shots, :, width:] = 0.0
+            self.loaded[shots] = True
+
+    def __getitem__(self, key):
+        shots = key[0] if isinstance(key, tuple) else key
+        self.fill(arange(len(self))[shots].ravel())
+
+        # fill() may swap in a wider array from another thread
+        with self.quick.lock:
+            return self.data[key]
+
+    def __array__(self, dtype=None, copy=None):
+        self.fill(range(len(self)))
+        with self.quick.lock:
+            return self.data if dtype is None else self.data.astype(dtype)
+
+
+class QuickLook:
+    """ Acquisition opened with only some of its shots parsed. The
+    boards asked for are LazyWave arrays with every shot number, and a
+    background thread parses the skipped shots into them.
+
+    Boards match a full board_waveform load when every shot has the
+    same number of breakpoints and one TR, which is what wave_truncate
+    assumes: each shot gets the TR found on its own SSP board, and the
+    count of end points cut is taken once, from the last shot, as
+    scale_time does for the whole acquisition.
+    """
+    def __init__(self, paths, shots, batch=64):
+        self.paths = paths
+        self.shot_count = len(paths)
+        self.batch = batch
+
+        # The last shot sets the truncation of every board, so it is
+        # always among the picked ones
+        self.shots = unique(concatenate([asarray(shots, dtype=int64),
+                                         [self.shot_count - 1]]))
+
+        # ElementTree roots of the picked shots only, TR of every shot
+        # (NaN until its file is read) and end points cut per board
+        self.roots = dict()
+        self.trs = full(self.shot_count, nan)
+        self.cuts = dict()
+        self.boards = dict()
+        self.lock = RLock()
+
+        self.parse(self.shots)
+
+        self.closed = False
+        self.worker = Thread(target=self._fill_loop, daemon=True)
+
+    def parse(self, shots):
+        """ Parses the files of shots, keeping the roots of picked shots
+        and the TR of every shot read
+
+        :param shots: Iterable of shot numbers
+        :return: List of the ElementTree roots of the shots
+        """
+        shots = [int(x) for x in shots]
+        with self.lock:
+            missing = [x for x in shots if x not in self.roots]
+
+        parsed = dict()
+        if missing:
+            roots = xml_root([self.paths[x] for x in missing], len(missing))
+            parsed = dict(zip(missing, roots))
+            trs = [shot_tr(x) for x in roots]
+
+            picked = set(self.shots.tolist())
+            with self.lock:
+                self.trs[missing] = trs
+                for shot in missing:
+                    if shot in picked:
+                        self.roots.setdefault(shot, parsed[shot])
+
+        with self.lock:
+            return [self.roots[x] if x in self.roots else parsed[x]
+                    for x in shots]
+
+    def cut(self, board_num):
+        # Count of end points cut from a board, from the last shot
+        with self.lock:
+            if board_num not in self.cuts:
+                last = self.shot_count - 1
+                wave_store = extract_wfm([self.roots[last]], board_num, 1)
+                self.cuts[board_num] = scale_time(wave_store,
+                                                  [self.trs[last]], 1)[1]
+
+            return self.cuts[board_num]
+
+    def extract(self, shots, board_num, parsed=None):
+        """ Board of some shots with the TR and truncation of a full load
+
+        :param shots: List of shot numbers
+        :param board_num: Integer representing sequencer board number (0-7)
+        :param parsed: Dict of shot number to ElementTree root for shots
+        already parsed; the others are parsed here
+        :return: Array of exciter/sequencer information for the shots
+        """
+        if parsed is not None and all(x in parsed for x in shots):
+            roots = [parsed[x] for x in shots]
+        else:
+            roots = self.parse(shots)
+        wave_store = extract_wfm(roots, board_num, len(shots))
+
+        wave = scale_time(wave_store, self.trs[shots], len(shots))[0]
+
+        return wave_truncate(wave, self.cut(board_num), len(shots))
+
+    def board(self, board_num):
+        """ LazyWave of a board; it is filled in the background from now on
+
+        :param board_num: Integer representing sequencer board number (0-7)
+        :return: LazyWave of the board for all shots
+        """
+        with self.lock:
+            if board_num not in self.boards:
+                self.boards[board_num] = LazyWave(self, board_num)
+
+            return self.boards[board_num]
+
+    def start(self):
+        # Starts parsing the skipped shots in the background, once
+        if self.worker.ident is None:
+            self.worker.start()
+
+    @property
+    def complete(self):
+        return not isnan(self.trs).any()
+
+    def _fill_loop(self):
+        for start in range(0, self.shot_count, self.batch):
+            if self.closed:
+                return
+
+            # Reading the batch also takes the TR of each shot
+            shots = range(start, min(start + self.batch, self.shot_count))
+            parsed = dict(zip(shots, self.parse(shots)))
+
+            # Only the boards toggled on so far are filled; the others
+            # parse the shots again when asked for.
+            with self.lock:
+                waves = list(self.boards.values())
+            for wave in waves:
+                wave.fill(shots, parsed)
+
+    def repetition_times(self):
+        """ TR of each shot read so far; shots the background thread has
+        not reached yet take the typical TR of the others. Nothing is
+        parsed here.
+        """
+        with self.lock:
+            trs = self.trs.copy()
+
+        known = ~isnan(trs)
+        trs[~known] = median(trs[known]) if known.any() else nan
+
+        return trs
+
+    def close(self):
+        self.closed = True
@@ -0,0 +1,201 @@
+# Author: Nana K. Owusu
+# This module contains functions that place the waveforms of many
+# shots on one time axis. Each shot from extract_wfm has its own
+# irregular set of time breakpoints (and shorter shots are padded with
+# zeros), so the shots are linearly interpolated onto a shared uniform
+# grid before they can be compared sample by sample. The ShotStatistics
+# class folds the resampled batches into per-sample aggregates so that
+# only one batch is held in memory at a time.
+
+# Module for math #
+from numpy import arange, argmax, clip, diff, linspace, searchsorted, \
+    take_along_axis, where, zeros, full, inf, sqrt, abs as np_abs, \
+    minimum, maximum
+
+# Module for resampling across processes #
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+
+def valid_length(times):
+    """ Input:
+            - times: array of time values with one row per shot.
+        Output:
+            - length: count of time values in each row before the zeros
+            padded on by extract_wfm.
+    """
+    falls = diff(times, axis=1) < 0
+
+    # Index of the first drop in time, or the full row if none
+    return where(falls.any(axis=1), argmax(falls, axis=1) + 1,
+                 times.shape[1])
+
+
+def common_grid(wave, samples):
+    """ Input:
+            - wave: waveform of a sequencer for all shots.
+            - samples: number of points in the grid.
+        Output:
+            - grid: uniform time values spanning every shot.
+    """
+    times = wave[:, 0, :]
+    last = take_along_axis(times, valid_length(times)[:, None] - 1, axis=1)
+
+    return linspace(times[:, 0].min(), last.max(), samples)
+
+
+def resample_shots(wave, grid):
+    """ Input:
+            - wave: waveform of a sequencer for a batch of shots.
+            - grid: uniform time values from common_grid().
+        Output:
+            - resampled: amplitudes of every shot at the grid times.
+    """
+    shot_count, wave_len = wave.shape[0], wave.shape[2]
+    times = wave[:, 0, :].copy()
+    amps = wave[:, 1, :].copy()
+
+    # Padding is replaced by the last valid point so that every row
+    # is non-decreasing and holds its final value past the end.
+    last = valid_length(times)[:, None] - 1
+    padded = arange(wave_len)[None, :] > last
+    times = where(padded, take_along_axis(times, last, axis=1), times)
+    amps = where(padded, take_along_axis(amps, last, axis=1), amps)
+
+    # Shift every row into its own band of time so that one sorted
+    # search covers the whole batch.
+    start = min(times.min(), grid[0])
+    span = max(times.max(), grid[-1]) - start + 1.0
+    offset = arange(shot_count)[:, None] * span
+
+    flat_times = (times - start + offset).ravel()
+    targets = (grid[None, :] - start) + offset
+
+    row_start = arange(shot_count)[:, None] * wave_len
+    lower = searchsorted(flat_times, targets.ravel(), side='right')
+    lower = clip(lower.reshape(targets.shape) - 1, row_start,
+                 row_start + wave_len - 2)
+    upper = lower + 1
+
+    flat_amps = amps.ravel()
+    t_lo, t_hi = flat_times[lower], flat_times[upper]
+    step = where(t_hi > t_lo, t_hi - t_lo, 1.0)
+    weight = clip((targets - t_lo) / step, 0.0, 1.0)
+
+    return flat_amps[lower] + weight * (flat_amps[upper] - flat_amps[lower])
+
+
+def bounded_map(func, jobs, workers=0):
+    """ Input:
+            - func: function called as func(*job); picklable if workers > 0.
+            - jobs: iterable of argument tuples, read only as they are sent.
+            - workers: number of processes; 0 runs in this process.
+        Output:
+            - generator of the results in the order of jobs.
+    """
+    if workers == 0:
+        for job in jobs:
+            yield func(*job)
+        return
+
+    # Keep at most two jobs per process in flight so memory
+    # stays bounded however many there are. Processes are spawned
+    # since the callers run this from a thread of the GUI process.
+    with ProcessPoolExecutor(max_workers=workers,
+                             mp_context=get_context('spawn')) as pool:
+        in_flight = []
+        for job in jobs:
+            in_flight.append(pool.submit(func, *job))
+            if len(in_flight) >= 2 * workers:
+                yield in_flight.pop(0).result()
+
+        for future in in_flight:
+            yield future.result()
+
+
+def resample_batches(wave, grid, batch=256, workers=0):
+    """ Input:
+            - wave: waveform of a sequencer for all shots.
+            - grid: uniform time values from common_grid().
+            - batch: number of shots resampled at a time.
+            - workers: number of processes; 0 resamples in this process.
+        Output:
+            - generator of (first shot, resampled batch) in shot order.
+    """
+    starts = range(0, wave.shape[0], batch)
+    jobs = ((wave[start:start + batch], grid) for start in starts)
+
+    yield from zip(starts, bounded_map(resample_shots, jobs, workers))
+
+
+class ShotStatistics:
+    """ Running per-sample aggregates over resampled shots: mean,
+    standard deviation, min/max envelope and the shot-to-shot delta.
+    Batches must be added in shot order for the delta to be right.
+    """
+    def __init__(self, samples):
+        self.count = 0
+        self.mean = zeros(samples)
+        self.sum_sq = zeros(samples)
+        self.low = full(samples, inf)
+        self.high = full(samples, -inf)
+
+        # Mean and largest absolute change between consecutive shots
+        self.delta_sum = zeros(samples)
+        self.delta_max = zeros(samples)
+        self.last_shot = None
+
+    def update(self, block):
+        """ Input:
+                - block: resampled amplitudes, one row per shot.
+        """
+        block_count = block.shape[0]
+        block_mean = block.mean(axis=0)
+        block_sq = ((block - block_mean) ** 2).sum(axis=0)
+
+        # Combine the batch with the running moments (Chan et al.)
+        total = self.count + block_count
+        shift = block_mean - self.mean
+        self.sum_sq += block_sq + shift ** 2 * self.count * block_count / total
+        self.mean += shift * block_count / total
+        self.count = total
+
+        self.low = minimum(self.low, block.min(axis=0))
+        self.high = maximum(self.high, block.max(axis=0))
+
+        steps = np_abs(diff(block, axis=0))
+        if self.last_shot is not None:
+            first_step = np_abs(block[0] - self.last_shot)
+            self.delta_sum += first_step
+            self.delta_max = maximum(self.delta_max, first_step)
+        if steps.shape[0] > 0:
+            self.delta_sum += steps.sum(axis=0)
+            self.delta_max = maximum(self.delta_max, steps.max(axis=0))
+        self.last_shot = block[-1].copy()
+
+    @property
+    def std(self):
+        return sqrt(self.sum_sq / max(self.count, 1))
+
+    @property
+    def delta_mean(self):
+        return self.delta_sum / max(self.count - 1, 1)
+
+
+def board_statistics(wave, samples=1024, batch=256, workers=0):
+    """ Input:
+            - wave: waveform of a sequencer for all shots.
+            - samples: number of points in the common time grid.
+            - batch: number of shots resampled at a time.
+            - workers: number of processes; 0 resamples in this process.
+        Output:
+            - grid: uniform time values.
+            - stats: ShotStatistics over every shot.
+    """
+    grid = common_grid(wave, samples)
+    stats = ShotStatistics(samples)
+
+    for start, block in resample_batches(wave, grid, batch, workers):
+        stats.update(block)
+
+    return grid, stats
@@ -0,0 +1,315 @@
+# Author: Nana K. Owusu
+# This module contains an optional local server that owns the parsing
+# and caching of shot directories, so that several viewers (or scripts)
+# opening the same acquisition share one warm copy. Directories are
+# listed with the same backend as GetXMLPath and boards are extracted
+# with board_waveform. Arrays are sent over HTTP in a small binary
+# frame: a magic word, three little-endian uint32 dimensions and the
+# float64 values.
+#
+# Start it with:  python dataset_server.py --port 8765 --root /data/scans
+# and point the viewer at it with:  python main.py --server localhost:8765
+# Only directories under the root are served, and by default only to
+# this machine.
+
+# Modules for serving and fetching #
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, urlencode
+from urllib.request import urlopen
+from json import dumps, loads
+from struct import pack, unpack, calcsize
+from threading import Lock
+from collections import OrderedDict
+from argparse import ArgumentParser
+from os import getcwd
+from os.path import realpath, commonpath
+from xml.etree.ElementTree import ParseError
+
+# Module for math #
+from numpy import frombuffer, float64, ascontiguousarray, asarray
+
+# Modules for reading shot directories #
+from backend_index import ShotIndex, dir_entries
+from backend_parser import xml_root
+from backend_exciters import ssp_end_time
+from PlotAnimator import board_waveform
+
+FRAME_MAGIC = b'SQVW'
+ALL_BOARDS = tuple(range(8))
+FRAME_HEADER = '<4sIII'
+
+
+def pack_frame(array):
+    """ Input:
+            - array: float64 array of up to three dimensions.
+        Output:
+            - frame: bytes of the header followed by the values.
+    """
+    array = ascontiguousarray(array, dtype=float64)
+    dims = (array.shape + (1, 1, 1))[:3]
+
+    return pack(FRAME_HEADER, FRAME_MAGIC, *dims) + array.tobytes()
+
+
+def unpack_frame(frame):
+    """ Input:
+            - frame: bytes from pack_frame().
+        Output:
+            - array: float64 array of shape (shots, 2, samples) or (n, 1, 1).
+    """
+    header = calcsize(FRAME_HEADER)
+    magic, shots, rows, samples = unpack(FRAME_HEADER, frame[:header])
+    if magic != FRAME_MAGIC:
+        raise UserWarning('The server reply is not a waveform frame.')
+
+    return frombuffer(frame, dtype=float64, offset=header).reshape(
+        shots, rows, samples)
+
+
+class DatasetCache:
+    """ Parsed directories and extracted boards shared by every
+    request. Boards are kept in least-recently-used order up to a
+    memory limit; a directory is parsed once even when several
+    clients ask for it at the same time.
+
+    The parsed ElementTree roots are not counted against the limit.
+    They are dropped once every board of their directory is cached
+    and parsed again only if one of those boards is evicted.
+
+    Everything held for a directory is dropped when files are added to
+    or removed from it (see resolve()).
+    """
+    def __init__(self, memory_limit=1024, root=None):
+        self.memory_limit = memory_limit * 2**20
+        self.root = realpath(root or getcwd())
+
+        # All keyed by the real path, so 'a/b', 'a/b/' and links to
+        # it share one entry
+        self.indexes = dict()
+        self.roots = dict()
+        self.trs = dict()
+        self.boards = OrderedDict()
+        self.board_bytes = 0
+
+        self.lock = Lock()
+        self.dir_locks = dict()
+
+    def dir_lock(self, directory):
+        with self.lock:
+            return self.dir_locks.setdefault(directory, Lock())
+
+    def resolve(self, directory):
+        """ Checks a requested directory; called once per request
+
+        :param directory: Path to a directory of XML files
+        :return: Real path of the directory, with anything cached for
+        it dropped if its list of files changed since it was indexed
+        """
+        directory = realpath(directory)
+        if commonpath([directory, self.root]) != self.root:
+            raise PermissionError('{0} is not under the served directory.'
+                                  .format(directory))
+
+        with self.dir_lock(directory):
+            index = self.indexes.get(directory)
+            if index is not None and dir_entries(directory) != index.listing:
+                self.forget(directory)
+
+        return directory
+
+    def forget(self, directory):
+        # Drops the index, roots, TRs and boards of a directory
+        with self.lock:
+            self.indexes.pop(directory, None)
+            self.roots.pop(directory, None)
+            self.trs.pop(directory, None)
+            for key in [x for x in self.boards if x[0] == directory]:
+                self.board_bytes -= self.boards.pop(key).nbytes
+
+    def shot_wave(self, directory, shot, board_num):
+        # The index records byte ranges and saves its manifest as
+        # files are read, so one request at a time per directory
+        index = self.index(directory)
+        with self.dir_lock(realpath(directory)):
+            return index.shot_wave(shot, board_num)
+
+    def index(self, directory):
+        directory = realpath(directory)
+        with self.dir_lock(directory):
+            if directory not in self.indexes:
+                self.indexes[directory] = ShotIndex.open(directory)
+
+            return self.indexes[directory]
+
+    def waveforms(self, directory):
+        # ElementTree roots of every shot, parsed on first use
+        directory = realpath(directory)
+        index = self.index(directory)
+        with self.dir_lock(directory):
+            if directory not in self.roots:
+                roots = xml_root(index.paths(), len(index))
+                self.roots[directory] = roots
+                self.trs[directory] = asarray(ssp_end_time(roots, len(roots)),
+                                              dtype=float64)
+
+            return self.roots[directory]
+
+    def board(self, directory, board_num):
+        directory = realpath(directory)
+        key = (directory, board_num)
+        with self.lock:
+            if key in self.boards:
+                self.boards.move_to_end(key)
+                return self.boards[key]
+
+        roots = self.waveforms(directory)
+        with self.dir_lock(directory):
+            with self.lock:
+                if key in self.boards:
+                    return self.boards[key]
+
+            wave = board_waveform(roots, board_num, len(roots))
+
+        with self.lock:
+            self.boards[key] = wave
+            self.board_bytes += wave.nbytes
+
+            # Drop the least recently used boards past the limit
+            while self.board_bytes > self.memory_limit and len(self.boards) > 1:
+                old_key, old_wave = self.boards.popitem(last=False)
+                self.board_bytes -= old_wave.nbytes
+
+            # The roots are no longer needed once every board is out
+            if all((directory, x) in self.boards for x in ALL_BOARDS):
+                self.roots.pop(directory, None)
+
+        return wave
+
+    def repetition_times(self, directory):
+        directory = realpath(directory)
+        with self.dir_lock(directory):
+            if directory in self.trs:
+                return self.trs[directory]
+
+        self.waveforms(directory)
+        return self.trs[directory]
+
+
+class DatasetHandler(BaseHTTPRequestHandler):
+    """ Request handler for the dataset server. Every request names the
+    directory with ?dir=; see DatasetClient for the calls.
+    """
+    cache = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {key: value[0] for key, value in parse_qs(url.query).items()}
+
+        try:
+            directory = self.cache.resolve(query['dir'])
+            if url.path == '/shots':
+                index = self.cache.index(directory)
+                self.reply(dumps({'convention': index.convention,
+                                  'names': index.names}).encode(),
+                           'application/json')
+            elif url.path == '/board':
+                wave = self.cache.board(directory, int(query['board']))
+                start = int(query.get('start', 0))
+                stop = int(query.get('stop', wave.shape[0]))
+                self.reply(pack_frame(wave[start:stop]))
+            elif url.path == '/shot':
+                self.reply(pack_frame(self.cache.shot_wave(
+                    directory, int(query['shot']), int(query['board']))))
+            elif url.path == '/tr':
+                self.reply(pack_frame(self.cache.repetition_times(directory)))
+            else:
+                self.send_error(404)
+        except PermissionError as err:
+            self.send_error(403, str(err))
+        except (KeyError, ValueError, IndexError, OSError, ParseError,
+                UserWarning) as err:
+            self.send_error(400, str(err))
+        except Exception as err:
+            # Anything else still gets an answer rather than a dropped
+            # connection
+            self.send_error(500, '{0}: {1}'.format(type(err).__name__, err))
+
+    def reply(self, body, content_type='application/octet-stream'):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        # Keep the console quiet
+        pass
+
+
+def make_server(host='127.0.0.1', port=8765, memory_limit=1024, root=None):
+    """ Input:
+            - host, port: address to listen on; port 0 picks a free one.
+            The loopback default keeps the server to this machine.
+            - memory_limit: megabytes of extracted boards to keep.
+            - root: only directories under it are served; the current
+            directory if None.
+        Output:
+            - server: ThreadingHTTPServer; call serve_forever() to run it.
+    """
+    handler = type('Handler', (DatasetHandler,),
+                   {'cache': DatasetCache(memory_limit, root)})
+
+    return ThreadingHTTPServer((host, port), handler)
+
+
+class DatasetClient:
+    """ Fetches shot listings and board waveforms from a dataset
+    server instead of parsing the XML files locally.
+    """
+    def __init__(self, address='localhost:8765', timeout=600):
+        self.base = 'http://' + address
+        self.timeout = timeout
+
+    def get(self, path, **query):
+        with urlopen(self.base + path + '?' + urlencode(query),
+                     timeout=self.timeout) as reply:
+            return reply.read()
+
+    def shot_names(self, directory):
+        """ Returns the naming convention and file names in shot order """
+        listing = loads(self.get('/shots', dir=directory))
+        return listing['convention'], listing['names']
+
+    def board_waveform(self, directory, board_num, start=0, stop=None):
+        """ Same array as PlotAnimator.board_waveform for shots start:stop """
+        query = {'dir': directory, 'board': board_num, 'start': start}
+        if stop is not None:
+            query['stop'] = stop
+
+        return unpack_frame(self.get('/board', **query))
+
+    def shot_wave(self, directory, shot, board_num):
+        """ Breakpoints of one board of one shot, read from its byte range """
+        return unpack_frame(self.get('/shot', dir=directory, shot=shot,
+                                     board=board_num))[:, :, 0]
+
+    def repetition_times(self, directory):
+        """ TR of each shot, as from ssp_end_time """
+        return unpack_frame(self.get('/tr', dir=directory))[:, 0, 0]
+
+
+if __name__ == '__main__':
+    options = ArgumentParser(description='Shared parsing and caching of '
+                                         'sequence shot directories.')
+    options.add_argument('--host', default='127.0.0.1',
+                         help='address to listen on; loopback by default')
+    options.add_argument('--port', type=int, default=8765)
+    options.add_argument('--memory', type=int, default=1024,
+                         help='megabytes of extracted boards to keep')
+    options.add_argument('--root', default=None,
+                         help='serve only directories under this one '
+                              '(default: the current directory)')
+    args = options.parse_args()
+
+    make_server(args.host, args.port, args.memory,
+                args.root).serve_forever()
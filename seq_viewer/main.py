@@ -4,8 +4,14 @@
 # class generates the tkinter window and contains the frame that
 # houses the widgets with which the user will be interacting.
 
+from argparse import ArgumentParser
 from ViewerGUI import MainContainer
 
 if __name__ == '__main__':
-    app = MainContainer()
+    options = ArgumentParser(description='Sequence waveform viewer.')
+    options.add_argument('--server', default=None,
+                         help='host:port of a running dataset_server')
+    args = options.parse_args()
+
+    app = MainContainer(server=args.server)
     app.mainloop()
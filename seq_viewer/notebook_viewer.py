@@ -0,0 +1,195 @@
+# Author: Nana K. Owusu
+# This module contains a Jupyter notebook viewer built on the same
+# backend as the tkinter application. Shots are read one at a time
+# through the directory's byte-offset index (or from a dataset server)
+# as the shot slider moves, and the lines of a single figure are
+# updated in place rather than drawing a new inline figure per shot.
+# With ipympl installed the figure is a live widget canvas and only
+# redraws; without it each shot is sent as a PNG image instead.
+#
+# Usage in a notebook cell:
+#     %matplotlib widget
+#     from notebook_viewer import NotebookViewer
+#     NotebookViewer('/path/to/xml/dir', boards=(1, 4)).show()
+
+# Modules for the widgets (optional dependency) #
+try:
+    from ipywidgets import IntSlider, Image, Label, VBox, HBox
+except ImportError:
+    IntSlider = None
+
+try:
+    from ipympl.backend_nbagg import Canvas
+except ImportError:
+    Canvas = None
+
+# Modules for loading shots on demand #
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from io import BytesIO
+
+# Modules for off-screen drawing #
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+# Modules from the viewer backend #
+from backend_index import ShotIndex
+from backend_exciters import ssp_wave_end_time, scale_time, wave_truncate
+from FrameCache import frame_limits
+
+BOARD_NAMES = ('SSP', 'XGRAD', 'YGRAD', 'ZGRAD',
+               'RHO1', 'RHO2', 'THETA1', 'THETA2')
+
+
+class ShotLoader:
+    """ Reads boards of single shots on demand and keeps the most
+    recent ones.
+    """
+    def __init__(self, directory, boards, client=None, keep=256):
+        self.directory = directory
+        self.boards = boards
+        self.client = client
+        self.keep = keep
+
+        if client is None:
+            self.index = ShotIndex.open(directory)
+            self.shot_count = len(self.index)
+        else:
+            self.index = None
+            self.shot_count = len(client.shot_names(directory)[1])
+
+        self.shots = OrderedDict()
+        self.pending = set()
+        self.lock = Lock()
+
+        # The index rewrites its manifest as files are read, so reads
+        # from the prefetch threads are taken one at a time.
+        self.read_lock = Lock()
+
+    def read(self, shot, board):
+        # Breakpoints as written in the file; the server's reply is
+        # read-only, so it is copied for scale_time to edit
+        if self.client is not None:
+            return self.client.shot_wave(self.directory, shot, board).copy()
+
+        return self.index.shot_wave(shot, board)
+
+    def read_shot(self, shot):
+        """ Boards of one shot treated as board_waveform treats a batch:
+        the TR from the SSP board replaces the end time and the points
+        past it are cut.
+
+        :param shot: Integer of the shot
+        :return: Dict of board number to [time, amplitude] array
+        """
+        ssp_ending = ssp_wave_end_time(self.read(shot, 0)[None], 1)
+
+        waves = dict()
+        for board in self.boards:
+            wave, idx_to_cut = scale_time(self.read(shot, board)[None],
+                                          ssp_ending, 1)
+            waves[board] = wave_truncate(wave, idx_to_cut, 1)[0]
+
+        return waves
+
+    def get(self, shot):
+        """ Returns {board: wave} for a shot, reading it if needed """
+        with self.lock:
+            if shot in self.shots:
+                self.shots.move_to_end(shot)
+                return self.shots[shot]
+
+        try:
+            with self.read_lock:
+                waves = self.read_shot(shot)
+        finally:
+            with self.lock:
+                self.pending.discard(shot)
+
+        with self.lock:
+            self.shots[shot] = waves
+            while len(self.shots) > self.keep:
+                self.shots.popitem(last=False)
+
+        return waves
+
+    def prefetch(self, pool, shots):
+        """ Submits reads of the shots that are neither held nor
+        already being read by an earlier submission.
+        """
+        with self.lock:
+            shots = [shot for shot in shots
+                     if shot not in self.shots and shot not in self.pending]
+            self.pending.update(shots)
+
+        for shot in shots:
+            pool.submit(self.get, shot)
+
+
+class NotebookViewer:
+    """ Shot slider and figure for a notebook. Moving the slider reads
+    the shot (if it is not already held) and updates the line data and
+    axis limits of the existing figure. The figure is drawn on an
+    ipympl canvas when that package is installed and is otherwise
+    sent as a PNG image.
+    """
+    def __init__(self, directory, boards=(1, 2, 3, 4), client=None,
+                 prefetch=8, width=9.0, row_height=1.8, dpi=80):
+        if IntSlider is None:
+            raise ImportError('NotebookViewer needs the ipywidgets package.')
+
+        self.loader = ShotLoader(directory, boards, client)
+        self.boards = boards
+        self.prefetch = prefetch
+        self.pool = ThreadPoolExecutor(max_workers=2)
+
+        self.fig = Figure(figsize=[width, row_height * len(boards)], dpi=dpi)
+        if Canvas is not None:
+            self.canvas = Canvas.new_manager(self.fig, 0).canvas
+            self.canvas.header_visible = False
+            self.image = None
+        else:
+            self.canvas = FigureCanvasAgg(self.fig)
+            self.image = Image(format='png')
+        self.fig.subplots_adjust(hspace=0.8)
+
+        self.lines = dict()
+        for idx, board in enumerate(boards):
+            ax = self.fig.add_subplot(len(boards), 1, idx + 1)
+            ax.set_title('Sequence {0} Board'.format(BOARD_NAMES[board]))
+            ax.set_ylabel('Amplitude \n(a.u.)')
+            self.lines[board] = ax.plot([], [], 'b-', lw=1)[0]
+
+        self.label = Label()
+        self.slider = IntSlider(min=0, max=max(self.loader.shot_count - 1, 0),
+                                description='Shot #', continuous_update=True)
+        self.slider.observe(lambda change: self.show_shot(change['new']),
+                            names='value')
+
+        self.show_shot(0)
+
+    def show(self):
+        return VBox([HBox([self.slider, self.label]),
+                     self.canvas if self.image is None else self.image])
+
+    def show_shot(self, shot):
+        waves = self.loader.get(shot)
+
+        for board, line in self.lines.items():
+            x_lim, y_lim = frame_limits(waves[board][0], waves[board][1])
+            line.set_data(waves[board][0], waves[board][1])
+            line.axes.set_xlim(x_lim)
+            line.axes.set_ylim(y_lim)
+
+        if self.image is None:
+            self.canvas.draw_idle()
+        else:
+            png = BytesIO()
+            self.fig.savefig(png, format='png')
+            self.image.value = png.getvalue()
+        self.label.value = '{0}/{1}'.format(shot, self.loader.shot_count - 1)
+
+        # Read the next shots while the user looks at this one
+        self.loader.prefetch(self.pool, range(
+            shot + 1, min(shot + 1 + self.prefetch, self.loader.shot_count)))
@@ -0,0 +1,71 @@
+# Author: Nana K. Owusu
+# Shared fixtures for the tests. The seq_viewer modules import each
+# other by bare name, so the package directory is put on the path the
+# same way main.py is run from it.
+
+# Modules for the import path #
+import sys
+from os.path import dirname, abspath, join
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+# Modules for writing shot directories #
+import pytest
+from numpy import arange, zeros_like, concatenate, round as np_round, sin
+
+SEQUENCERS = ('SSP', 'XGRAD', 'YGRAD', 'ZGRAD',
+              'RHO1', 'RHO2', 'THETA1', 'THETA2')
+
+
+def write_shots(directory, shot_count, step=4.0, decimals=None, ssp_step=10.0):
+    """ Input:
+            - directory: existing directory the XML files are written to.
+            - shot_count: number of shots (plot.xml.1 ... plot.xml.N).
+            - step: time between points of the gradient and RF boards.
+            - decimals: round amplitudes to this many decimal places;
+            by default they are steps of 1/32767.
+            - ssp_step: time between points of the SSP board. With 400,
+            ssp_end_time finds one TR per shot instead of two.
+        Output:
+            - paths: full paths of the files in shot order.
+    """
+    paths = []
+    for shot in range(shot_count):
+        parts = ['<?xml version="1.0"?>\n<plotter>']
+        tr = 1000.0 + (shot % 3) * 4
+
+        for board, name in enumerate(SEQUENCERS):
+            t = arange(0, 990, step if board else ssp_step)
+            a = zeros_like(t)
+            if board:
+                pulse = (t > 100 + shot % 7) & (t < 300)
+                a[pulse] = sin(t[pulse] / 40.0 + board) * (1 + 0.01 * shot)
+                a[pulse] = np_round(a[pulse] * 32767) / 32767 \
+                    if decimals is None else np_round(a[pulse], decimals)
+                a[(t > 500) & (t < 700)] = -0.5 * (board % 3)
+            t = concatenate([t, [tr, tr + 0.2, tr + 0.4]])
+            a = concatenate([a, [0, 0, 0]])
+
+            points = '\n'.join('{0} {1}'.format(x, y) for x, y in zip(t, a))
+            parts.append('<seq name="{0}"><wave>\n{1}\n</wave></seq>'
+                         .format(name, points))
+
+        parts.append('</plotter>\n')
+        path = join(directory, 'plot.xml.{0}'.format(shot + 1))
+        with open(path, 'w') as xml_file:
+            xml_file.write(''.join(parts))
+        paths.append(path)
+
+    return paths
+
+
+@pytest.fixture
+def shot_dir(tmp_path):
+    """ Factory writing a directory of synthetic shots """
+    def make(shot_count, name='acq', **kwargs):
+        directory = tmp_path / name
+        directory.mkdir()
+        write_shots(str(directory), shot_count, **kwargs)
+        return str(directory)
+
+    return make
@@ -0,0 +1,28 @@
+# Author: Nana K. Owusu
+# Tests of the per-shot figures of merit read a chunk at a time.
+
+from numpy import array_equal
+
+from backend_analytics import acquisition_metrics, wave_metrics
+from backend_index import ShotIndex
+from backend_parser import xml_root
+from PlotAnimator import board_waveform
+
+
+def test_metrics_match_the_plotted_boards(shot_dir):
+    # One TR per shot, so chunks line up with a full load
+    directory = shot_dir(7, ssp_step=400.0)
+    paths = ShotIndex.open(directory).paths()
+    roots = xml_root(paths, 7)
+
+    for workers in (0, 2):
+        metrics = acquisition_metrics(paths, boards=(1, 4), chunk=3,
+                                      workers=workers)
+
+        for board in (1, 4):
+            # Measured on the TR-scaled and truncated board, not the
+            # end points as written in the file
+            expected = wave_metrics(board_waveform(roots, board, 7), board)
+            rows = metrics[metrics['board'] == board]
+            for name in ('shot', 'duration', 'peak', 'max_slew', 'rms'):
+                assert array_equal(rows[name], expected[name])
@@ -0,0 +1,36 @@
+# Author: Nana K. Owusu
+# Tests of reading shot files out of archives.
+
+from zipfile import ZipFile
+
+import pytest
+from numpy import array_equal
+
+from backend_archive import archive_load, extract_then_load
+from backend_parser import extract_wfm
+
+
+def test_extract_then_load_matches_streaming(shot_dir, tmp_path):
+    directory = shot_dir(5)
+    path = str(tmp_path / 'shots.zip')
+    with ZipFile(path, 'w') as archive:
+        for shot in range(1, 6):
+            name = 'plot.xml.{0}'.format(shot)
+            archive.write(directory + '/' + name, 'acq/' + name)
+
+    names, roots = archive_load(path)
+    extracted_names, extracted_roots = extract_then_load(path)
+
+    assert [x.split('/')[-1] for x in names] == extracted_names
+    assert array_equal(extract_wfm(roots, 1, 5),
+                       extract_wfm(extracted_roots, 1, 5))
+
+
+def test_archive_without_xml_is_a_value_error(tmp_path):
+    # Only a folder, no files to walk to
+    path = str(tmp_path / 'empty.zip')
+    with ZipFile(path, 'w') as archive:
+        archive.writestr('acq/', '')
+
+    with pytest.raises(ValueError):
+        extract_then_load(path)
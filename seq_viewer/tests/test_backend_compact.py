@@ -0,0 +1,59 @@
+# Author: Nana K. Owusu
+# Tests of the compact storage mode against the float64 waveforms it
+# replaces.
+
+from numpy import ndarray, float32, int16, int32, abs as np_abs, \
+    array_equal, finfo
+
+from backend_parser import xml_root
+from backend_compact import CompactWave
+from PlotAnimator import board_waveform
+
+from conftest import write_shots
+
+SHOTS = 6
+
+
+def both_waves(tmp_path, board, **kwargs):
+    # float64 and compact waveforms of a board of the same files
+    paths = write_shots(str(tmp_path), SHOTS, **kwargs)
+    roots = xml_root(paths, SHOTS)
+
+    return board_waveform(roots, board, SHOTS), \
+        board_waveform(roots, board, SHOTS, compact=True)
+
+
+def test_int16_amplitudes_round_trip_exactly(tmp_path):
+    wave, compact = both_waves(tmp_path, 2, decimals=4)
+
+    assert isinstance(compact, CompactWave)
+    assert compact.ticks.dtype == int32
+    assert compact.amps.dtype == int16
+    assert compact.shape == wave.shape
+    assert compact.nbytes < wave.nbytes
+
+    assert array_equal(compact[:], wave)
+    for shot in range(SHOTS):
+        assert array_equal(compact[shot, 0, :], wave[shot, 0, :])
+        assert array_equal(compact[shot, 1, :], wave[shot, 1, :])
+
+
+def test_float32_amplitudes_within_tolerance(tmp_path):
+    wave, compact = both_waves(tmp_path, 3)
+
+    assert isinstance(compact, CompactWave)
+    assert compact.amps.dtype == float32
+
+    # Times stay bit-exact; amplitudes are within float32 rounding
+    decoded = compact[:]
+    assert array_equal(decoded[:, 0, :], wave[:, 0, :])
+
+    error = np_abs(decoded[:, 1, :] - wave[:, 1, :])
+    assert (error <= finfo(float32).eps * np_abs(wave[:, 1, :])).all()
+
+
+def test_times_off_the_tick_grid_are_kept_as_float64(tmp_path):
+    wave, compact = both_waves(tmp_path, 1, step=1 / 3)
+
+    assert isinstance(compact, ndarray)
+    assert array_equal(compact, wave)
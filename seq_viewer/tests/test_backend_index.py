@@ -0,0 +1,47 @@
+# Author: Nana K. Owusu
+# Tests of the byte-offset index of a shot directory.
+
+from os import listdir
+from threading import Thread
+
+from numpy import array_equal
+
+from backend_index import ShotIndex, MANIFEST_NAME
+from backend_parser import xml_root
+from backend_exciters import ssp_end_time
+from PlotAnimator import board_waveform
+
+
+def test_concurrent_saves_leave_one_whole_manifest(shot_dir):
+    directory = shot_dir(6)
+    index = ShotIndex.open(directory)
+    index.index_files()
+
+    def save_often():
+        for count in range(25):
+            index.changed = True
+            index.save()
+
+    writers = [Thread(target=save_often) for count in range(6)]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+
+    saved = ShotIndex.load(directory)
+    assert saved is not None and saved.files == index.files
+    assert [x for x in listdir(directory) if x.startswith('.')] == [MANIFEST_NAME]
+
+
+def test_board_read_by_slices_matches_board_waveform(shot_dir):
+    directory = shot_dir(7)
+    roots = xml_root(ShotIndex.open(directory).paths(), 7)
+
+    # A new index reads the slices while the background thread indexes
+    index = ShotIndex.open(directory)
+    index.index_in_background()
+    for board in (0, 1, 4):
+        assert array_equal(index.board_waveform(board),
+                           board_waveform(roots, board, 7))
+    assert index.repetition_times() == ssp_end_time(roots, 7)
+    index.close()
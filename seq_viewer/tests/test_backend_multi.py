@@ -0,0 +1,56 @@
+# Author: Nana K. Owusu
+# Tests of lining up and subtracting acquisitions of unequal length.
+
+from numpy import isnan, isfinite, allclose
+
+from backend_multi import acquisition_boards, align_shots, wave_difference, \
+    AcquisitionSet
+
+
+def test_difference_of_shorter_acquisition(shot_dir):
+    wave = acquisition_boards(shot_dir(40, 'long'), (1,))[1]
+    other = acquisition_boards(shot_dir(30, 'short'), (1,))[1]
+
+    # The GUI pads the compared acquisition before subtracting
+    aligned = align_shots(other, len(wave))
+    assert isnan(aligned[30:]).all()
+
+    for compared in (other, aligned):
+        difference = wave_difference(wave, compared, samples=256, batch=8)
+
+        assert difference.shape == (40, 2, 256)
+        assert isfinite(difference[:30]).all()
+        assert isnan(difference[30:, 1]).all()
+        assert allclose(difference[:, 0], difference[0, 0])
+
+
+def test_difference_of_same_acquisition(shot_dir):
+    wave = acquisition_boards(shot_dir(12), (2,))[2]
+
+    difference = wave_difference(wave, wave.copy(), samples=128)
+
+    assert allclose(difference[:, 1], 0.0)
+
+
+def test_failed_directory_is_reported(shot_dir, tmp_path):
+    acquisitions = AcquisitionSet(workers=1)
+    try:
+        good = shot_dir(5)
+        bad = tmp_path / 'broken'
+        bad.mkdir()
+        (bad / 'plot.xml.1').write_text('<plotter><seq')
+        (bad / 'plot.xml.2').write_text('<plotter><seq')
+
+        acquisitions.add(good, (1,))
+        acquisitions.add(str(bad), (1,))
+
+        waves, errors = acquisitions.boards(1)
+        assert len(waves) == 1 and len(waves[0]) == 5
+        assert [x[0] for x in errors] == [str(bad)]
+
+        # The difference is taken in the set's worker thread
+        differences = acquisitions.difference(waves[0], waves).result()
+        assert len(differences) == 1
+        assert allclose(differences[0][:, 1], 0.0)
+    finally:
+        acquisitions.close()
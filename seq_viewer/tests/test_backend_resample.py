@@ -0,0 +1,15 @@
+# Author: Nana K. Owusu
+# Tests of the bounded process pool shared by the resampling and
+# analytics backends.
+
+from operator import mul
+
+from backend_resample import bounded_map
+
+
+def test_results_keep_the_order_of_the_jobs():
+    jobs = [(x, 3) for x in range(25)]
+    expected = [x * 3 for x in range(25)]
+
+    assert list(bounded_map(mul, jobs)) == expected
+    assert list(bounded_map(mul, iter(jobs), workers=2)) == expected
@@ -0,0 +1,105 @@
+# Author: Nana K. Owusu
+# Tests of the dataset server with several client processes fetching
+# at once, checked against boards extracted locally.
+
+from threading import Thread
+from multiprocessing import Pool
+from urllib.error import HTTPError
+
+import pytest
+from numpy import array_equal, asarray, float64
+
+from backend_index import ShotIndex
+from backend_parser import xml_root
+from backend_exciters import ssp_end_time
+from PlotAnimator import board_waveform
+from dataset_server import make_server, DatasetClient
+
+from conftest import write_shots
+
+SHOTS = 8
+
+
+@pytest.fixture
+def server(tmp_path):
+    httpd = make_server(port=0, root=str(tmp_path))
+    worker = Thread(target=httpd.serve_forever, daemon=True)
+    worker.start()
+
+    yield '{0}:{1}'.format(*httpd.server_address)
+
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def fetch(job):
+    # Runs in a client process
+    address, directory, request, board = job
+    client = DatasetClient(address, timeout=60)
+
+    if request == 'board':
+        return client.board_waveform(directory, board)
+    if request == 'slice':
+        return client.board_waveform(directory, board, start=2, stop=5)
+    if request == 'shot':
+        return client.shot_wave(directory, 3, board)
+    return client.repetition_times(directory)
+
+
+def test_client_processes_match_local_boards(server, shot_dir):
+    directory = shot_dir(SHOTS)
+
+    index = ShotIndex.open(directory)
+    roots = xml_root(index.paths(), len(index))
+    local = {board: board_waveform(roots, board, SHOTS) for board in range(8)}
+
+    # The same directory spelt two ways shares one cache entry
+    jobs = [(server, directory + '/' * (board % 2), 'board', board)
+            for board in range(8)]
+    jobs += [(server, directory, 'slice', 5), (server, directory, 'shot', 2),
+             (server, directory, 'tr', 0)]
+
+    with Pool(4) as pool:
+        replies = pool.map(fetch, jobs)
+
+    for board in range(8):
+        assert array_equal(replies[board], local[board])
+    assert array_equal(replies[8], local[5][2:5])
+    assert array_equal(replies[9], index.shot_wave(3, 2))
+    assert array_equal(replies[10],
+                       asarray(ssp_end_time(roots, SHOTS), dtype=float64))
+
+
+def test_unreadable_directory_is_a_bad_request(server, tmp_path):
+    broken = tmp_path / 'broken'
+    broken.mkdir()
+    (broken / 'plot.xml.1').write_text('<plotter><seq')
+    (broken / 'plot.xml.2').write_text('<plotter><seq')
+
+    with pytest.raises(HTTPError) as err:
+        DatasetClient(server, timeout=60).board_waveform(str(broken), 1)
+
+    assert err.value.code == 400
+
+
+def test_directory_outside_the_root_is_refused(server, tmp_path_factory):
+    outside = tmp_path_factory.mktemp('outside')
+    write_shots(str(outside), 2)
+
+    with pytest.raises(HTTPError) as err:
+        DatasetClient(server, timeout=60).board_waveform(str(outside), 1)
+
+    assert err.value.code == 403
+
+
+def test_added_shots_are_picked_up(server, shot_dir):
+    directory = shot_dir(4)
+    client = DatasetClient(server, timeout=60)
+
+    assert len(client.board_waveform(directory, 1)) == 4
+    assert len(client.shot_names(directory)[1]) == 4
+
+    write_shots(directory, 6)
+
+    assert len(client.board_waveform(directory, 1)) == 6
+    assert len(client.repetition_times(directory)) >= 6
@@ -0,0 +1,47 @@
+# Author: Nana K. Owusu
+# Tests of the shots read on demand by the notebook viewer.
+
+from numpy import array_equal
+
+from backend_index import ShotIndex
+from backend_parser import xml_root
+from PlotAnimator import board_waveform
+from notebook_viewer import ShotLoader
+
+
+def test_shots_match_board_waveform(shot_dir):
+    directory = shot_dir(6)
+    roots = xml_root(ShotIndex.open(directory).paths(), 6)
+
+    loader = ShotLoader(directory, (1, 4))
+    for shot in (0, 3, 5):
+        waves = loader.get(shot)
+        for board in (1, 4):
+            # Same TR replacement and truncation as a one-shot batch
+            expected = board_waveform([roots[shot]], board, 1)[0]
+            assert array_equal(waves[board], expected)
+            assert waves[board].shape[1] == \
+                board_waveform(roots, board, 6).shape[2]
+
+
+class CountingPool:
+    """ Records submissions and runs none of them """
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, func, shot):
+        self.submitted.append(shot)
+
+
+def test_prefetch_skips_shots_in_flight(shot_dir):
+    loader = ShotLoader(shot_dir(6), (1,))
+    loader.get(1)
+    pool = CountingPool()
+
+    loader.prefetch(pool, range(1, 4))
+    loader.prefetch(pool, range(2, 5))
+    assert pool.submitted == [2, 3, 4]
+
+    # A finished read leaves the in-flight set
+    loader.get(2)
+    assert loader.pending == {3, 4}
@@ -0,0 +1,109 @@
+# Author: Nana K. Owusu
+# Tests of the playback pace when only a subset of the shots is played.
+
+import tkinter
+
+import pytest
+from numpy import arange
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+import PlaybackControl
+from PlotAnimator import ShotAnimator
+
+
+class Clock:
+    # Stands in for perf_counter so the test does not sleep
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class StopButton:
+    def config(self, **kwargs):
+        pass
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = Clock()
+    monkeypatch.setattr(PlaybackControl, 'perf_counter', fake)
+    return fake
+
+
+@pytest.fixture
+def animator():
+    # A Tcl interpreter is enough for the tkinter variables
+    tkinter._default_root = tkinter.Tcl()
+    fig = Figure()
+    FigureCanvasAgg(fig)
+
+    animator = ShotAnimator(fig, pool_size=1)
+    animator.stop_btn = StopButton()
+    animator.shot_len = 100
+    animator.shot_subset = arange(0, 100, 10)
+
+    yield animator
+
+    # Nothing was rendered on purpose; keeps matplotlib from warning
+    animator._draw_was_started = True
+    animator.frame_cache.close()
+    tkinter._default_root = None
+
+
+def play(animator, clock, seconds):
+    # Next shot of the playback after some time, as drawn by the timer
+    clock.now += seconds
+    shot = next(animator.frame_seq)
+    animator.current_frame = shot
+    animator.playback.frame_drawn(shot, 0.0)
+    return shot
+
+
+def test_pause_and_resume_a_subset(animator, clock):
+    animator.playback.mode = 'Fixed fps'
+    animator.playback.fps = 1.0
+    animator.frame_seq = animator.new_frame_seq()
+
+    assert play(animator, clock, 0.0) == 0
+    assert play(animator, clock, 1.0) == 10
+
+    animator.pause_play()
+    clock.now += 30.0
+    animator.pause_play()
+
+    # Resuming carries on with the next shot of the subset
+    assert play(animator, clock, 1.0) == 20
+    assert play(animator, clock, 1.0) == 30
+    assert animator.playback.skipped == 0
+    assert animator.playback.achieved == pytest.approx(1.0)
+
+
+def test_real_time_subset_waits_for_the_skipped_shots(animator, clock):
+    # Every shot lasts one second, so a stride of 10 shows a shot
+    # every ten seconds
+    animator.playback.set_repetition_times([1e6] * 100, 100)
+    animator.playback.mode = 'Real time'
+    animator.rate_mode.set('Real time')
+    animator.rate_fps.set('1')
+    animator.frame_seq = animator.new_frame_seq()
+
+    assert play(animator, clock, 0.0) == 0
+    assert animator.playback.target_interval(0) == pytest.approx(10.0)
+
+    animator.rate_changed()
+    assert play(animator, clock, 10.0) == 10
+    assert play(animator, clock, 10.0) == 20
+    assert animator.playback.skipped == 0
+
+
+def test_real_time_without_trs_is_reported(animator, clock):
+    animator.rate_mode.set('Real time')
+    animator.rate_fps.set('1')
+    animator.tr_source = lambda: []
+    animator.rate_changed()
+
+    assert 'no TRs' in animator.rate_txt.get()
+    assert animator.playback.target_interval(0) == 0.0
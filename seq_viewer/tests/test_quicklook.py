@@ -0,0 +1,63 @@
+# Author: Nana K. Owusu
+# Tests of the shot range typed for a quick look, the shots it picks
+# and the boards it fills in.
+
+import pytest
+from numpy import array_equal, asarray
+
+from ViewerGUI import slice_text
+from backend_parser import xml_root
+from backend_exciters import ssp_end_time
+from backend_quicklook import pick_shots, QuickLook
+from PlotAnimator import board_waveform
+
+from conftest import write_shots
+
+
+def test_shot_range_as_in_a_slice():
+    assert slice_text('::10') == (0, None, 10)
+    assert slice_text(' 100 : 2000 : 5 ') == (100, 2000, 5)
+    assert slice_text('7') == (7, None, 1)
+
+    shots = pick_shots(50, *slice_text('10:30:10'))
+    assert list(shots) == [0, 10, 20, 49]
+
+
+@pytest.mark.parametrize('text', ['1:a', '1.5', '1:2:3:4', '::x'])
+def test_mistyped_shot_range_is_rejected(text):
+    with pytest.raises(ValueError):
+        slice_text(text)
+
+
+def test_filled_quick_look_matches_a_full_load(tmp_path):
+    paths = write_shots(str(tmp_path), 12, ssp_step=400.0)
+    full = board_waveform(xml_root(paths, 12), 2, 12)
+
+    # Batches of 5 leave the last batch with two shots
+    quick = QuickLook(paths, pick_shots(12, stride=4), batch=5)
+    wave = quick.board(2)
+    assert wave.loaded.sum() == len(quick.shots)
+
+    quick.start()
+    quick.worker.join()
+
+    assert array_equal(asarray(wave), full)
+    assert array_equal(quick.repetition_times(),
+                       ssp_end_time(xml_root(paths, 12), 12))
+
+
+def test_only_picked_shots_stay_parsed(tmp_path):
+    paths = write_shots(str(tmp_path), 12, ssp_step=400.0)
+    quick = QuickLook(paths, [0, 6])
+
+    # The TRs of the shots not read yet are estimated, not parsed
+    assert sorted(quick.roots) == [0, 6, 11]
+    assert len(quick.repetition_times()) == 12
+    assert sorted(quick.roots) == [0, 6, 11]
+
+    quick.board(3)[4, 0, :]
+    quick.start()
+    quick.worker.join()
+
+    assert sorted(quick.roots) == [0, 6, 11]
+    assert quick.complete